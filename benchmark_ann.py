@@ -0,0 +1,73 @@
+import torch
+import argparse
+import time
+
+from utils.mann import *
+from utils.mann_approx import *
+from utils.mann_binary import *
+from utils.mann_ann import *
+
+parser = argparse.ArgumentParser('Benchmark the top-k retrieval over a large key memory')
+parser.add_argument('--num_keys', type=int, default=20000, help='Number of keys in the memory.')
+parser.add_argument('--num_classes', type=int, default=4000, help='Number of classes of the keys.')
+parser.add_argument('--num_queries', type=int, default=500, help='Number of queries.')
+parser.add_argument('--feature_dim', type=int, default=512, help='The dimension of the feature vectors.')
+parser.add_argument('--noise', type=float, default=0.1,
+                    help='The queries are keys with this fraction of their elements perturbed.')
+parser.add_argument('--k', type=int, default=10, help='Number of keys retrieved for each query.')
+parser.add_argument('--device', type=str, default='cpu', help='Device to run the benchmark on.')
+args = parser.parse_args()
+
+
+def timed(f, *inputs):
+    """ The output and the time (s) of f(*inputs). """
+    start = time.time()
+    output = f(*inputs)
+    if torch.device(args.device).type == 'cuda':
+        torch.cuda.synchronize()
+    return output, time.time() - start
+
+
+def recall(keys, exact_keys):
+    """ Fraction of the exact top-k keys which are retrieved. """
+    found = (keys.unsqueeze(2) == exact_keys.unsqueeze(1)).any(1)
+    return found.float().mean().item()
+
+
+def benchmark(kv, queries, exact_keys, name, sim):
+    """ Time the exact similarity sim over the memory kv, then the IVF search at several nprobe. """
+    _, t = timed(sim, kv, queries)
+    print('{:<36}{:>10.3f}{:>12}{:>14.2f}'.format(name + ' exact', 1.0, '-', t * 1e3))
+    index, t_build = timed(IVFIndex, kv)
+    for nprobe in [1, 4, 8, 16, 32]:
+        index.nprobe = min(nprobe, index.nlist)
+        (_, found_keys), t = timed(index.search, queries, args.k)
+        print('{:<36}{:>10.3f}{:>12.2f}{:>14.2f}'.format(
+            '{} IVF nlist={} nprobe={}'.format(name, index.nlist, index.nprobe),
+            recall(found_keys, exact_keys), t_build, t * 1e3))
+
+
+def main():
+    device = torch.device(args.device)
+    labels = torch.arange(args.num_keys, device=device) % args.num_classes
+    keys = torch.randn(args.num_keys, args.feature_dim, device=device)
+    targets = torch.randint(args.num_keys, (args.num_queries,), device=device)
+    noise = torch.rand(args.num_queries, args.feature_dim, device=device) < args.noise
+    queries = torch.where(noise, torch.randn_like(keys[targets]), keys[targets])
+
+    print('{:<36}{:>10}{:>12}{:>14}'.format('index', 'recall', 'build (s)', 'search (ms)'))
+
+    # binary keys: exact bipolar similarity versus IVF on the unpacked keys
+    binary_keys, binary_queries = torch.sign(keys), torch.sign(queries)
+    kv = BinaryKeyValueMemory(binary_keys, labels)
+    w = 1 / args.feature_dim * torch.matmul(binary_queries, binary_keys.t())
+    benchmark(kv, binary_queries, w.topk(args.k, dim=1)[1], 'binary', sim_comp_binary)
+
+    # real-valued keys: exact cosine versus IVF
+    kv = KeyValueMemory(keys, labels)
+    K = torch.matmul(F.normalize(queries, dim=-1), F.normalize(keys, dim=-1).t())
+    benchmark(kv, queries, K.topk(args.k, dim=1)[1], 'cosine', sim_comp)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,176 +1,390 @@
-import random
-import torch
-from torch.utils.data import DataLoader
-from torch.utils.data.sampler import Sampler
-import torchvision.transforms as transforms
-from data.dataset import *
-import numpy as np
-import os
-
-
-class Rotate(object):
-
-    def __init__(self, angle):
-        self.angle = angle
-
-    def __call__(self, x, mode="reflect"):
-        x = x.rotate(self.angle)
-        return x
-
-
-def omniglot_character_folders(data_path):
-    data_folder = data_path  # I may add a args here
-
-    # 1) for family in os.listdir(data_folder): all folders under the data_folder, each folder is a 'family'
-    # 2) if os.path.isdir(os.path.join(data_folder, family)): ./data/[family]
-    # 3) for character in os.list(os.path.join(data_folder, family)): the folders in
-    #  ./data/[family]/, each folder is a 'character' .
-    # 4) os.path.join(data_folder, family, character): ./data/[family]/[character]
-    # 5) character_folders: a list, each element is a string to record character path
-    character_folders = [os.path.join(data_folder, family, character) \
-                         for family in os.listdir(data_folder) \
-                         if os.path.isdir(os.path.join(data_folder, family)) \
-                         for character in os.listdir(os.path.join(data_folder, family))]
-
-    # shuffle the string
-    random.seed(806)
-    random.shuffle(character_folders)
-
-    # divide the data into training set and testing set
-    num_train = 964  # according to Nat Comm
-    manntrain_character_folders = character_folders[:num_train]
-    mannval_character_folders = character_folders[num_train:]
-
-    # list formed by string
-    return manntrain_character_folders, mannval_character_folders
-
-
-class OmniglotTask(object):
-
-    def __init__(self, character_folders, num_classes, train_num, query_num, val_num):
-        # 1) character_folders: a list, each of its element is path to a character
-        # 2) num_classes: an int, number of classes
-        # 3) train_num: an int, number of samples for each class when training
-        # 4) query_num: an int, number of samples for each class when testing
-        # 5) val_num: an int, number of samples for each class when doing validation. For training
-        #    dataset, val_num > 0; for testing dataset, val_num = 0.
-
-        self.character_folders = character_folders
-        self.num_classes = num_classes
-        self.train_num = train_num
-        self.test_num = query_num
-        self.val_num = val_num
-
-        # randomly get #num_classes dir strings.
-        class_folders = random.sample(self.character_folders, self.num_classes)
-        # generate labels according to the #num_classes.
-        labels = np.array(range(len(class_folders)))
-        # assgin a number to each folder
-        labels = dict(zip(class_folders, labels))
-
-        samples = dict()
-
-        self.train_roots = []
-        self.test_roots = []
-        self.val_roots = []
-        for c in class_folders:  # for training dataset, c: ./data/[family]/[character]
-            # 1) for x in os.listdir(c): for all the files under the ./data/family/character directory
-            # 2) os.path.join(c, x): ./data/[family]/[character]/[c]
-            # 3) temp is a list, each of its element is a string that records ./data/[family]/[character]/[c]
-            temp = [os.path.join(c, x) for x in os.listdir(c)]
-            # 1) samples is a dictionary
-            # 2) len(temp) = num_classes
-            # 3) temp: ./data/[family]/[character]/[x]
-            # 4) equivalent to randperm?
-            samples[c] = random.sample(temp, len(temp))
-
-            self.train_roots += samples[c][:train_num]
-            self.test_roots += samples[c][train_num:(train_num + query_num)]
-            self.val_roots += samples[c][(train_num + query_num):(train_num + query_num + val_num)]
-
-        # train_roots have train_num * num_classes paths
-        # 1) for x in self.train_root: ./data/family/character/y
-        # 2) for self.get_class(x): see below
-        # 3) labels[get ./data/[family]/[character]] = label
-        self.train_labels = [labels['/' + self.get_class(x)] for x in self.train_roots]
-
-        # test_roots have query_num * num_classes paths
-        # The same as above
-        self.test_labels = [labels['/' + self.get_class(x)] for x in self.test_roots]
-
-        # val_roots have val_num * num_classes paths
-        # The same as above
-        self.val_labels = [labels['/' + self.get_class(x)] for x in self.val_roots]
-
-    def get_class(self, sample):
-        """ get ./data/[family]/[character] """
-        return os.path.join(*sample.split('/')[:-1])
-
-
-class ClassBalancedSampler(Sampler):
-    """
-    Select #num_per_class samples from each class in the 'num_cl' pools.
-
-    - num_per_class: number of shots.
-    - num_cl: number of classes.
-    - num_inst: number of instances per class.
-    - shuffle: change the order of the samples.
-    """
-
-    def __init__(self, num_per_class, num_cl, num_inst, shuffle=True):
-        self.num_per_class = num_per_class
-        self.num_cl = num_cl
-        self.num_inst = num_inst
-        self.shuffle = shuffle
-
-    def __iter__(self):
-        """ Return a single list of indices, assuming that items will be grouped by class. """
-
-        # 1) for j in range(self.num_cl): for each class for i in torch.randperm(self.num_inst): for all the samples in
-        # 2) one selected class j torch.randperm(self.num_inst)[:self.num_per_class]: choose fixed number of samples,
-        # namely, number of shots each class
-        # 3) i+j*self.num_inst: assuming that items will be grouped by class
-        if self.shuffle:
-            batch = [[i + j * self.num_inst for i in torch.randperm(self.num_inst)[:self.num_per_class] for j in
-                      range(self.num_cl)]]
-        else:  # no randperm to change the order of samples in one class
-            batch = [[i + j * self.num_inst for i in range(self.num_inst)[:self.num_per_class]] for j in
-                     range(self.num_cl)]
-
-        # [[a1,a2,....,an], ..., [z1, z2,...,zn]] --> [a1, a2,...,an,...,z1,z2,...,zn]
-        batch = [item for sublist in batch for item in sublist]
-
-        # batch is a list with each element as a index now
-        if self.shuffle:
-            random.shuffle(batch)
-
-        return iter(batch)
-
-    def __len__(self):
-        return 1
-
-
-def get_data_loader(task, num_per_class=5, split='train', shuffle=True, rotation=0):
-    """
-    - task: it consists data and labels, which will be split into train / val set.
-    - num_per_class: number of shots (m-way, n-shot problem).
-    - split: a str, to split the dataset or not.
-    - shuffle: Bool, which decides to change the order of samples idx or not.
-    - rotation: data augmentation.
-    """
-
-    normalize = transforms.Normalize(mean=[0.92206], std=[0.08426])
-
-    dataset = Omniglot(task, split=split,
-                       transform=transforms.Compose([Rotate(rotation), transforms.ToTensor(), normalize]))
-
-    if split == 'train':
-        sampler = ClassBalancedSampler(num_per_class, task.num_classes, task.train_num, shuffle=shuffle)
-    elif split == 'val':
-        sampler = ClassBalancedSampler(num_per_class, task.num_classes, task.val_num, shuffle=shuffle)
-    elif split == 'query':
-        sampler = ClassBalancedSampler(num_per_class, task.num_classes, task.test_num, shuffle=shuffle)
-
-    loader = DataLoader(dataset, batch_size=num_per_class * task.num_classes, sampler=sampler)
-
-    return loader
+import random
+import torch
+from torch.utils.data import DataLoader
+from torch.utils.data.dataloader import default_collate
+from torch.utils.data.sampler import Sampler
+import torchvision.transforms as transforms
+from data.dataset import *
+import numpy as np
+import os
+import json
+from collections import OrderedDict
+
+
+class Rotate(object):
+
+    def __init__(self, angle):
+        self.angle = angle
+
+    def __call__(self, x, mode="reflect"):
+        x = x.rotate(self.angle)
+        return x
+
+
+def rotate_batch(images, angle):
+    """ Rotate a batch of images [b, c, h, w] counter-clockwise by angle (0 / 90 / 180 / 270), the same as Rotate. """
+    return torch.rot90(images, angle // 90, [2, 3])
+
+
+class RotateCollate(object):
+    """ Collate the samples of an episode and rotate the whole batch once, instead of Rotate on each PIL image. """
+
+    def __init__(self, angle):
+        self.angle = angle
+
+    def __call__(self, batch):
+        images, labels = default_collate(batch)
+        return rotate_batch(images, self.angle), labels
+
+
+def omniglot_manifest(data_path, manifest_path=None):
+    """
+    The directory index of the dataset, i.e., an OrderedDict ./data/[family]/[character] -> list of image paths,
+    in the same order as os.listdir, so that no directory listing is needed in the episode loop.
+
+    - data_path: the path to the dataset.
+    - manifest_path: a json file to persist the index. It is reused as long as the modification times of
+      data_path and of all the family / character folders are unchanged, otherwise it is rebuilt.
+    """
+    if manifest_path is not None and os.path.isfile(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        # a folder's mtime changes when files are added to / removed from it
+        if manifest['data_path'] == data_path and \
+                all(os.path.isdir(d) and os.path.getmtime(d) == t for d, t in manifest['mtimes'].items()):
+            return OrderedDict((c, files) for c, files in manifest['characters'])
+
+    mtimes = {data_path: os.path.getmtime(data_path)}
+    characters = OrderedDict()
+    for family in os.listdir(data_path):
+        family_folder = os.path.join(data_path, family)
+        if not os.path.isdir(family_folder):
+            continue
+        mtimes[family_folder] = os.path.getmtime(family_folder)
+        for character in os.listdir(family_folder):
+            c = os.path.join(family_folder, character)
+            mtimes[c] = os.path.getmtime(c)
+            characters[c] = [os.path.join(c, x) for x in os.listdir(c)]
+
+    if manifest_path is not None:
+        with open(manifest_path, 'w') as f:
+            json.dump({'data_path': data_path, 'mtimes': mtimes, 'characters': list(characters.items())}, f)
+
+    return characters
+
+
+def omniglot_character_folders(data_path, cache=None, manifest=None):
+    data_folder = data_path  # I may add a args here
+
+    # 1) for family in os.listdir(data_folder): all folders under the data_folder, each folder is a 'family'
+    # 2) if os.path.isdir(os.path.join(data_folder, family)): ./data/[family]
+    # 3) for character in os.list(os.path.join(data_folder, family)): the folders in
+    #  ./data/[family]/, each folder is a 'character' .
+    # 4) os.path.join(data_folder, family, character): ./data/[family]/[character]
+    # 5) character_folders: a list, each element is a string to record character path
+    # 6) with a preprocessed cache (see OmniglotCache) or a directory index (see omniglot_manifest), the
+    #  folders are read from the index instead
+    if cache is not None:
+        character_folders = list(cache.characters)
+    elif manifest is not None:
+        character_folders = list(manifest.keys())
+    else:
+        character_folders = [os.path.join(data_folder, family, character) \
+                             for family in os.listdir(data_folder) \
+                             if os.path.isdir(os.path.join(data_folder, family)) \
+                             for character in os.listdir(os.path.join(data_folder, family))]
+
+    # shuffle the string
+    random.seed(806)
+    random.shuffle(character_folders)
+
+    # divide the data into training set and testing set
+    num_train = 964  # according to Nat Comm
+    manntrain_character_folders = character_folders[:num_train]
+    mannval_character_folders = character_folders[num_train:]
+
+    # list formed by string
+    return manntrain_character_folders, mannval_character_folders
+
+
+class OmniglotTask(object):
+
+    def __init__(self, character_folders, num_classes, train_num, query_num, val_num, manifest=None):
+        # 1) character_folders: a list, each of its element is path to a character
+        # 2) num_classes: an int, number of classes
+        # 3) train_num: an int, number of samples for each class when training
+        # 4) query_num: an int, number of samples for each class when testing
+        # 5) val_num: an int, number of samples for each class when doing validation. For training
+        #    dataset, val_num > 0; for testing dataset, val_num = 0.
+        # 6) manifest: the directory index from omniglot_manifest or None. If given, the image paths are
+        #    read from it instead of os.listdir.
+
+        self.character_folders = character_folders
+        self.manifest = manifest
+        self.num_classes = num_classes
+        self.train_num = train_num
+        self.test_num = query_num
+        self.val_num = val_num
+
+        # randomly get #num_classes dir strings.
+        class_folders = random.sample(self.character_folders, self.num_classes)
+        # generate labels according to the #num_classes.
+        labels = np.array(range(len(class_folders)))
+        # assgin a number to each folder
+        labels = dict(zip(class_folders, labels))
+
+        samples = dict()
+
+        self.train_roots = []
+        self.test_roots = []
+        self.val_roots = []
+        self.train_labels = []
+        self.test_labels = []
+        self.val_labels = []
+        for c in class_folders:  # for training dataset, c: ./data/[family]/[character]
+            # 1) for x in os.listdir(c): for all the files under the ./data/family/character directory
+            # 2) os.path.join(c, x): ./data/[family]/[character]/[c]
+            # 3) temp is a list, each of its element is a string that records ./data/[family]/[character]/[c]
+            if self.manifest is not None:
+                temp = self.manifest[c]
+            else:
+                temp = [os.path.join(c, x) for x in os.listdir(c)]
+            # 1) samples is a dictionary
+            # 2) len(temp) = num_classes
+            # 3) temp: ./data/[family]/[character]/[x]
+            # 4) equivalent to randperm?
+            samples[c] = random.sample(temp, len(temp))
+
+            self.train_roots += samples[c][:train_num]
+            self.test_roots += samples[c][train_num:(train_num + query_num)]
+            self.val_roots += samples[c][(train_num + query_num):(train_num + query_num + val_num)]
+
+            # the label of ./data/[family]/[character] for each of its roots
+            self.train_labels += [labels[c]] * len(samples[c][:train_num])
+            self.test_labels += [labels[c]] * len(samples[c][train_num:(train_num + query_num)])
+            self.val_labels += [labels[c]] * len(samples[c][(train_num + query_num):(train_num + query_num + val_num)])
+
+    def get_class(self, sample):
+        """ get ./data/[family]/[character] """
+        return os.path.join(*sample.split('/')[:-1])
+
+
+class EpisodeSampler(object):
+    """
+    Sample m-way n-shot episodes from an OmniglotCache with tensor operations, i.e., the classes and the
+    (support, query, val) samples of an episode are drawn in one call, and the batches are gathered from
+    the preprocessed images directly, without building a Dataset / DataLoader per episode.
+
+    - cache: an OmniglotCache.
+    - character_folders: a list, the characters to sample from, see omniglot_character_folders.
+    """
+
+    def __init__(self, cache, character_folders):
+        self.cache = cache
+        ids = np.array([cache.character_ids[c] for c in character_folders])
+        self.starts = torch.from_numpy(cache.offsets[ids].astype(np.int64))  # [C]
+        self.counts = torch.from_numpy((cache.offsets[ids + 1] - cache.offsets[ids]).astype(np.int64))  # [C]
+        self.max_count = int(self.counts.max())
+
+    def sample_task(self, num_classes, train_num, query_num, val_num=0):
+        """ The same split as OmniglotTask, returned as an EpisodeTask of image indices. """
+        classes = torch.randperm(len(self.starts))[:num_classes]
+        # the ids beyond the count of a class would be the images of the next character
+        if train_num + query_num + val_num > int(self.counts[classes].min()):
+            raise ValueError('an episode needs {} samples per class, more than the images of a character.'.format(
+                train_num + query_num + val_num))
+
+        # a random permutation of the samples of each class, the positions beyond the count of a class go last
+        order = torch.rand(num_classes, self.max_count)
+        order[torch.arange(self.max_count).unsqueeze(0) >= self.counts[classes].unsqueeze(1)] = 2
+        ids = self.starts[classes].unsqueeze(1) + order.argsort(1)  # [m, max_count]
+
+        return EpisodeTask(self, ids[:, :train_num], ids[:, train_num:(train_num + query_num)],
+                           ids[:, (train_num + query_num):(train_num + query_num + val_num)])
+
+    def select(self, ids, num_per_class, shuffle=True):
+        """
+        Select num_per_class samples from each row of ids, the same as ClassBalancedSampler.
+
+        - ids: a matrix, which is of size [m, pool], the image indices of each class.
+        - num_per_class: number of samples per class.
+        - shuffle: Bool, random samples of the pool in a random order, or the first ones grouped by class.
+        """
+        m, pool = ids.size()
+        if shuffle:
+            ids = ids.gather(1, torch.rand(m, pool).argsort(1)[:, :num_per_class])
+        else:
+            ids = ids[:, :num_per_class]
+        labels = torch.arange(m).unsqueeze(1).expand(m, num_per_class).reshape(-1)
+        ids = ids.reshape(-1)
+        if shuffle:
+            perm = torch.randperm(len(ids))
+            ids, labels = ids[perm], labels[perm]
+
+        return ids, labels
+
+    def load(self, ids, rotation=0):
+        """ The images of ids (a vector of image indices), rotated by rotation (0 / 90 / 180 / 270). """
+        # the same as ToTensor + Normalize, the cache keeps the unrotated images
+        images = torch.from_numpy(self.cache.images[ids.numpy()]).unsqueeze(1)  # [len(ids), 1, 32, 32]
+        images = (images.float().div(255) - 0.92206) / 0.08426
+
+        return rotate_batch(images, rotation)
+
+    def get_batch(self, ids, num_per_class, shuffle=True, rotation=0):
+        """ The images and labels of select(ids, num_per_class, shuffle), the same as Omniglot. """
+        ids, labels = self.select(ids, num_per_class, shuffle=shuffle)
+
+        return self.load(ids, rotation), labels
+
+
+class EpisodeTask(object):
+    """ An episode sampled by EpisodeSampler, the roots of OmniglotTask are replaced by matrices of image indices. """
+
+    def __init__(self, sampler, train_ids, test_ids, val_ids):
+        self.sampler = sampler
+        self.train_ids = train_ids  # [m, train_num]
+        self.test_ids = test_ids  # [m, query_num]
+        self.val_ids = val_ids  # [m, val_num]
+        self.num_classes = train_ids.size(0)
+        self.train_num = train_ids.size(1)
+        self.test_num = test_ids.size(1)
+        self.val_num = val_ids.size(1)
+
+
+class EpisodeLoader(object):
+    """ A one-batch loader of an EpisodeTask, which can be used in place of the DataLoader of get_data_loader. """
+
+    def __init__(self, task, ids, num_per_class, shuffle, rotation):
+        self.task = task
+        self.ids = ids
+        self.num_per_class = num_per_class
+        self.shuffle = shuffle
+        self.rotation = rotation
+
+    def __iter__(self):
+        yield self.task.sampler.get_batch(self.ids, self.num_per_class, shuffle=self.shuffle, rotation=self.rotation)
+
+    def __len__(self):
+        return 1
+
+
+class FeatureBank(object):
+    """
+    The features of all the images of an EpisodeSampler under the 4 rotations, computed once by a frozen
+    controller. Evaluation episodes are then sampled from the bank, i.e., a gather instead of a forward pass.
+
+    - controller: the (frozen) Controller.
+    - sampler: an EpisodeSampler.
+    - device: the device of the controller and the bank.
+    - batch_size: number of images per forward pass when building the bank.
+    - dtype: the data type of the stored features, e.g. torch.half to halve the size of the bank.
+    - binarize: store the signs of the features as int8, for the binarized (quantization_infer) test. The
+      features are signed before the cast, since a small feature can round to 0 in float16.
+    """
+
+    def __init__(self, controller, sampler, device, batch_size=1000, dtype=torch.float, binarize=False):
+        self.sampler = sampler
+        if binarize:
+            dtype = torch.int8
+
+        # all the images of the characters of the sampler, and the row of each image in the bank
+        ids = torch.cat([torch.arange(int(start), int(start + count))
+                         for start, count in zip(sampler.starts, sampler.counts)])
+        self.rows = torch.full((len(sampler.cache.images),), -1, dtype=torch.long)
+        self.rows[ids] = torch.arange(len(ids))
+
+        features = []
+        for rotation in [0, 90, 180, 270]:
+            chunks = [controller(sampler.load(chunk, rotation).to(device)) for chunk in ids.split(batch_size)]
+            if binarize:
+                chunks = [torch.sign(chunk) for chunk in chunks]
+            features.append(torch.cat([chunk.to(dtype) for chunk in chunks]))
+        self.features = torch.stack(features)  # [4, N, d]
+
+    def get_batch(self, ids, num_per_class, shuffle=True, rotation=0):
+        """ The same as EpisodeSampler.get_batch, but returns the features [m * num_per_class, d] of the images. """
+        ids, labels = self.sampler.select(ids, num_per_class, shuffle=shuffle)
+        features = self.features[rotation // 90, self.rows[ids].to(self.features.device)]
+
+        return features.float(), labels
+
+
+class ClassBalancedSampler(Sampler):
+    """
+    Select #num_per_class samples from each class in the 'num_cl' pools.
+
+    - num_per_class: number of shots.
+    - num_cl: number of classes.
+    - num_inst: number of instances per class.
+    - shuffle: change the order of the samples.
+    """
+
+    def __init__(self, num_per_class, num_cl, num_inst, shuffle=True):
+        self.num_per_class = num_per_class
+        self.num_cl = num_cl
+        self.num_inst = num_inst
+        self.shuffle = shuffle
+
+    def __iter__(self):
+        """ Return a single list of indices, assuming that items will be grouped by class. """
+
+        # 1) for j in range(self.num_cl): for each class for i in torch.randperm(self.num_inst): for all the samples in
+        # 2) one selected class j torch.randperm(self.num_inst)[:self.num_per_class]: choose fixed number of samples,
+        # namely, number of shots each class
+        # 3) i+j*self.num_inst: assuming that items will be grouped by class
+        if self.shuffle:
+            batch = [[i + j * self.num_inst for i in torch.randperm(self.num_inst)[:self.num_per_class] for j in
+                      range(self.num_cl)]]
+        else:  # no randperm to change the order of samples in one class
+            batch = [[i + j * self.num_inst for i in range(self.num_inst)[:self.num_per_class]] for j in
+                     range(self.num_cl)]
+
+        # [[a1,a2,....,an], ..., [z1, z2,...,zn]] --> [a1, a2,...,an,...,z1,z2,...,zn]
+        batch = [item for sublist in batch for item in sublist]
+
+        # batch is a list with each element as a index now
+        if self.shuffle:
+            random.shuffle(batch)
+
+        return iter(batch)
+
+    def __len__(self):
+        return 1
+
+
+def get_data_loader(task, num_per_class=5, split='train', shuffle=True, rotation=0):
+    """
+    - task: it consists data and labels, which will be split into train / val set.
+    - num_per_class: number of shots (m-way, n-shot problem).
+    - split: a str, to split the dataset or not.
+    - shuffle: Bool, which decides to change the order of samples idx or not.
+    - rotation: data augmentation.
+    """
+
+    # episodes sampled by EpisodeSampler are gathered from the preprocessed images
+    if isinstance(task, EpisodeTask):
+        if split == 'train':
+            ids = task.train_ids
+        elif split == 'val':
+            ids = task.val_ids
+        elif split == 'query':
+            ids = task.test_ids
+        return EpisodeLoader(task, ids, num_per_class, shuffle, rotation)
+
+    normalize = transforms.Normalize(mean=[0.92206], std=[0.08426])
+
+    # the rotation is applied to the whole batch, see RotateCollate
+    dataset = Omniglot(task, split=split, transform=transforms.Compose([transforms.ToTensor(), normalize]))
+
+    if split == 'train':
+        sampler = ClassBalancedSampler(num_per_class, task.num_classes, task.train_num, shuffle=shuffle)
+    elif split == 'val':
+        sampler = ClassBalancedSampler(num_per_class, task.num_classes, task.val_num, shuffle=shuffle)
+    elif split == 'query':
+        sampler = ClassBalancedSampler(num_per_class, task.num_classes, task.test_num, shuffle=shuffle)
+
+    loader = DataLoader(dataset, batch_size=num_per_class * task.num_classes, sampler=sampler,
+                        collate_fn=RotateCollate(rotation))
+
+    return loader
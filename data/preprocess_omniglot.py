@@ -0,0 +1,48 @@
+import os
+import argparse
+import numpy as np
+from PIL import Image
+
+
+def omniglot2cache(data_path, cache_path, image_size=32):
+    """
+    Decode, convert and resize all the Omniglot images once, and store them in two files under cache_path:
+    - images.npy: a uint8 array of size [N, image_size, image_size], the images of one character are contiguous.
+    - index.npz: 'characters', the character folders (./data/[family]/[character]) in the order of
+      omniglot_character_folders, and 'offsets', an int64 array of size [C + 1], the images of
+      characters[c] are images[offsets[c]:offsets[c + 1]].
+    """
+    if not os.path.isdir(cache_path):
+        os.makedirs(cache_path)
+
+    # the same order as omniglot_character_folders
+    character_folders = [os.path.join(data_path, family, character)
+                         for family in os.listdir(data_path)
+                         if os.path.isdir(os.path.join(data_path, family))
+                         for character in os.listdir(os.path.join(data_path, family))]
+
+    offsets = [0]
+    for c in character_folders:
+        offsets.append(offsets[-1] + len(os.listdir(c)))
+
+    images = np.lib.format.open_memmap(os.path.join(cache_path, 'images.npy'), mode='w+', dtype=np.uint8,
+                                       shape=(offsets[-1], image_size, image_size))
+    for i, c in enumerate(character_folders):
+        for j, x in enumerate(sorted(os.listdir(c))):
+            image = Image.open(os.path.join(c, x))
+            image = image.convert('L')
+            image = image.resize((image_size, image_size), resample=Image.LANCZOS)
+            images[offsets[i] + j] = np.asarray(image, dtype=np.uint8)
+    images.flush()
+
+    np.savez(os.path.join(cache_path, 'index.npz'), characters=np.array(character_folders),
+             offsets=np.array(offsets, dtype=np.int64))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Preprocess Omniglot into a uint8 image cache')
+    parser.add_argument('--data_dir', type=str, help='The path to the dataset, shold be a absolute path')
+    parser.add_argument('--cache_dir', type=str, help='The path to store the preprocessed images.')
+    args = parser.parse_args()
+
+    omniglot2cache(args.data_dir, args.cache_dir)
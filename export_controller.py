@@ -0,0 +1,85 @@
+import torch
+import argparse
+import os
+import time
+
+from model.controller import *
+from model.frozen_controller import *
+from model.frozen_export import *
+
+parser = argparse.ArgumentParser('Export a frozen Controller from a checkpoint')
+parser.add_argument('--pretrained_dir', type=str, help='The path to the pretrained ckpt.')
+parser.add_argument('--output', type=str, help='The path to save the frozen Controller.')
+parser.add_argument('--quantization_learn', type=str, default='No',
+                    choices={'No', 'XNOR', 'XNOR_binary_fc', 'RBNN', 'RBNN_binary_fc'},
+                    help='The quant mode of the Controller.')
+parser.add_argument('--input_channel', type=int, default=1, help='Number of input channel of the samples.')
+parser.add_argument('--feature_dim', type=int, default=512, help='The dimension of the feature vectors.')
+parser.add_argument('--rotation_update', default=1, type=int, help='interval of updating rotation matrix (default:1)')
+parser.add_argument('--a32', default=1, type=int, choices={0, 1}, help='w1a32')
+parser.add_argument('--traced_output', type=str, default=None,
+                    help='The path to save the traced (TorchScript) Controller, optional.')
+parser.add_argument('--repeat', type=int, default=20, help='Number of timed forward passes.')
+args = parser.parse_args()
+
+
+def load_checkpoint_controller():
+    """ The training way to restore a Controller: the full checkpoint and the training modules. """
+    ckpt = torch.load(args.pretrained_dir, map_location='cpu')
+    controller = Controller(num_in_channels=args.input_channel, feature_dim=args.feature_dim,
+                            quant=args.quantization_learn, rotation_update=args.rotation_update, a32=args.a32)
+    controller.load_state_dict(strip_module_prefix(ckpt['state_dict']))
+
+    return controller.eval()
+
+
+def timeit(f, x, repeat):
+    """ Average time (s) of f(x) over repeat runs, after one warm-up run. """
+    with torch.no_grad():
+        f(x)
+        start = time.time()
+        for _ in range(repeat):
+            f(x)
+    return (time.time() - start) / repeat
+
+
+def main():
+    start_time = time.time()
+    controller = load_checkpoint_controller()
+    checkpoint_time = time.time() - start_time
+
+    export_controller(controller, args.quantization_learn, args.output)
+
+    start_time = time.time()
+    frozen = load_controller(args.output)
+    frozen_time = time.time() - start_time
+
+    # the frozen Controller generates the same features
+    x = torch.randn(10, args.input_channel, 32, 32)
+    with torch.no_grad():
+        diff = (frozen(x) - controller(x)).abs().max().item()
+
+    print('checkpoint: {:.2f} MB, loaded in {:.3f} s'.format(os.path.getsize(args.pretrained_dir) / 2 ** 20,
+                                                             checkpoint_time))
+    print('frozen:     {:.2f} MB, loaded in {:.3f} s'.format(os.path.getsize(args.output) / 2 ** 20, frozen_time))
+    print('max |diff| of the features: {:.2e}'.format(diff))
+
+    if args.traced_output is not None:
+        trace_controller(frozen, x, args.traced_output)
+
+        start_time = time.time()
+        traced = load_traced_controller(args.traced_output)
+        traced_time = time.time() - start_time
+        with torch.no_grad():
+            diff = (traced(x) - controller(x)).abs().max().item()
+
+        print('traced:     {:.2f} MB, loaded in {:.3f} s'.format(os.path.getsize(args.traced_output) / 2 ** 20,
+                                                                 traced_time))
+        print('max |diff| of the features: {:.2e}'.format(diff))
+        print('forward (ms): eager {:.2f}, frozen {:.2f}, traced {:.2f}'.format(
+            timeit(controller, x, args.repeat) * 1e3, timeit(frozen, x, args.repeat) * 1e3,
+            timeit(traced, x, args.repeat) * 1e3))
+
+
+if __name__ == '__main__':
+    main()
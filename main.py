@@ -1,499 +1,713 @@
-import torch
-import torch.nn as nn
-import torch.nn.functional as F
-from torch.autograd import Variable, Function
-from torch.optim.lr_scheduler import StepLR
-import torch.backends.cudnn as cudnn
-import numpy as np
-import os
-import logging.config
-import math
-import argparse
-import random
-import time, datetime
-import os
-import shutil
-
-from utils.mann import *
-from utils.mann_approx import *
-from data.dataset import *
-from data.data_loading import *
-from model.controller import *
-from quant.XNOR_module import *
-
-# argparse
-parser = argparse.ArgumentParser('MANN for Few-Shot Learning')
-
-# log path
-parser.add_argument(
-    '--log_dir',
-    type=str,
-    help='The path to store the training log file.')
-
-# data path
-parser.add_argument(
-    '--data_dir',
-    type=str,
-    help='The path to the dataset, shold be a absolute path')
-
-# controller structure
-parser.add_argument(
-    '--input_channel',
-    type=int,
-    default=1,
-    help='The number of channels of the input.')
-
-parser.add_argument(
-    '--feature_dim',
-    type=int,
-    default=512,
-    help='The dimension of the feature vectors generated by the controller.')
-
-# m-way, n-shot problem
-parser.add_argument(
-    '--class_num',
-    type=int,
-    default=5,
-    help='Number of classes used in the MANN training.')
-
-parser.add_argument(
-    '--num_shot',
-    type=int,
-    default=5,
-    help='Number of samples per class.')
-
-# data sampling for training data
-parser.add_argument(
-    '--pool_query_train',
-    type=int,
-    default=10,
-    help='(Training phase) Number of samples that will be reserved for sampling queries')
-
-parser.add_argument(
-    '--pool_val_train',
-    type=int,
-    default=5,
-    help='(Training phase) Number of samples that will be reserved for sampling validation samples')
-
-parser.add_argument(
-    '--batch_size_train',
-    type=int,
-    default=15,
-    help='(Training phase) Number of queries per class.')
-
-parser.add_argument(
-    '--val_num_train',
-    type=int,
-    default=3,
-    help='(Training phase) Number of samples used to do validation.')
-
-# data sampling for testing data
-parser.add_argument(
-    '--pool_query_test',
-    type=int,
-    default=10,
-    help='(Inference phase) Number of samples that will be reserved for sampling queries')
-
-parser.add_argument(
-    '--batch_size_test',
-    type=int,
-    default=15,
-    help='(Inference phase) Number of queries per class.')
-
-# episode & log interval
-parser.add_argument(
-    '--train_episode',
-    type=int,
-    default=1000,
-    help='Number of episode to train the controller.')
-
-parser.add_argument(
-    '--log_interval',
-    type=int,
-    default=10,
-    help='Intervals to print the training process.')
-
-parser.add_argument(
-    '--val_episode',
-    type=int,
-    default=250,
-    help='Number of episode to validate the controller.')
-
-parser.add_argument(
-    '--val_interval',
-    type=int,
-    default=200,
-    help='Intervals to validate the controller.')
-
-parser.add_argument(
-    '--test_episode',
-    type=int,
-    default=1000,
-    help='Number of episode to test the mature controller.')
-
-# optimizer
-parser.add_argument(
-    '--learning_rate',
-    type=float,
-    default=1e-3,
-    help='Initial learning rate.')
-
-# quantizatoin
-parser.add_argument(
-    '--quantization_learn',
-    type=str,
-    default='No',
-    choices={'No', 'XNOR', 'XNOR_binary_fc'},
-    help='Binarize the Controller or not.')
-
-parser.add_argument(
-    '--quantization_infer',
-    type=int,
-    default=0,
-    choices={0, 1},
-    help='Binarize the features or not.')
-
-# RBNN setting
-parser.add_argument(
-    '--rotation_update',
-    default=1,
-    type=int,
-    metavar='N',
-    help='interval of updating rotation matrix (default:1)')
-
-parser.add_argument(
-    '--a32',
-    default=1,
-    type=int,
-    choices={0, 1},
-    help='w1a32')
-
-# test pretrain or not
-parser.add_argument(
-    '--test_only',
-    type=int,
-    default=0,
-    choices={0, 1},
-    help='Use a pretrained Controller or not.')
-
-parser.add_argument(
-    '--pretrained_dir',
-    type=str,
-    default=None,
-    help='The path to the pretrained ckpt.')
-
-# choose the scheme to calculate similarity
-parser.add_argument(
-    '--sim_cal',
-    type=str,
-    default='softabs',
-    choices={'cos_softabs', 'cos_softmax', 'dot_abs'},
-    help='The scheme to calculate similarity.')
-
-# binary or bipolar
-parser.add_argument(
-    '--binary_id',
-    type=int,
-    default=1,
-    choices={1, 2},
-    help='choose binary (binary-1, {-1, 1}) or bipolar (binary-2, {0, 1}).')
-
-# resume
-parser.add_argument(
-    '--resume',
-    action='store_true',
-    help='whether continue training from the same directory', )
-
-# gpu
-parser.add_argument(
-    '--gpu',
-    type=str,
-    default='0',
-    help='Select gpu to use.')
-
-args = parser.parse_args()
-
-
-# set up logger
-def get_logger(file_path):
-    logger = logging.getLogger('gal')
-    log_format = '%(asctime)s | %(message)s'
-    formatter = logging.Formatter(log_format, datefmt='%m/%d %I:%M:%S %p')
-    file_handler = logging.FileHandler(file_path)
-    file_handler.setFormatter(formatter)
-    stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(formatter)
-
-    logger.addHandler(file_handler)
-    logger.addHandler(stream_handler)
-    logger.setLevel(logging.INFO)
-
-    return logger
-
-
-# main
-def main():
-    cudnn.benchmark = True
-    cudnn.enabled = True
-
-    # make the log directory and log the args
-    if not os.path.isdir(args.log_dir):
-        os.makedirs(args.log_dir)
-    now = datetime.datetime.now().strftime('%Y-%m-%d-%H:%M:%S')
-    logger = get_logger(os.path.join(args.log_dir, 'logger' + now + '.log'))
-    logger.info("args = %s", args)
-    logger.info('-' * 50)
-
-    # init the data folder ...
-    logger.info("========> Initialize data folders...")
-    # init character folders for dataset construction
-    manntrain_character_folders, manntest_character_folders = omniglot_character_folders(data_path=args.data_dir)
-
-    # init the controller ...
-    logger.info("========> Build and Initialize the Controller...")
-    controller = Controller(num_in_channels=args.input_channel, feature_dim=args.feature_dim,
-                            quant=args.quantization_learn)
-    logger.info(controller)
-    controller.cuda()
-    if len(args.gpu) > 1:
-        device_id = []
-        for i in range((len(args.gpu) + 1) // 2):
-            device_id.append(i)
-        controller = nn.DataParallel(controller, device_ids=device_id).cuda()
-
-    if args.test_only == 0:
-        # define the optimizer
-        optimizer = torch.optim.Adam(controller.parameters(), lr=args.learning_rate)
-        lr_scheduler = StepLR(optimizer, step_size=100000, gamma=0.5)
-
-        # build graph
-        logger.info("========> Training...")
-
-        best_accuracy = 0.0
-
-        # loss function
-        criterion = nn.CrossEntropyLoss()
-        criterion = criterion.cuda()
-
-        total_rewards1 = 0
-        start_episode = 0
-
-        # resume
-        if args.resume:
-            logger.info('========> Loading checkpoint {} ...'.format(args.pretrained_dir))
-            ckpt = torch.load(args.pretrained_dir)
-            start_episode = ckpt['episode'] + 1
-            best_accuracy = ckpt['best_acc']
-
-            # deal with the single-multi GPU problem
-            new_state_dic = OrderedDict()
-            tmp_ckpt = ckpt['state_dict']
-            if len(args.gpu) > 1:
-                for k, v in tmp_ckpt.items():
-                    new_state_dic['module.' + k.replace('module.', '')] = v
-            else:
-                for k, v in tmp_ckpt.items():
-                    new_state_dic[k.replace('module.', '')] = v
-
-            controller.load_state_dict(new_state_dic)
-            logger.info('loaded checkpoint {} episode = {}', format(args.pretrained_dir, start_episode))
-
-        ######################
-        #     Train
-        ######################
-        episode = start_episode
-        for episode in range(args.train_episode):
-
-            # init dataset
-            # sample_dataloader: obtain previous samples for compare
-            # batch_dataloader: batch samples for training
-            degrees = random.choice([0, 90, 180, 270])  # data augmentation
-            task_train = OmniglotTask(manntrain_character_folders, args.class_num, args.num_shot, args.pool_query_train,
-                                      val_num=args.pool_val_train)
-            support_dataloader = get_data_loader(task_train, num_per_class=args.num_shot, split='train',
-                                                 shuffle=False, rotation=degrees)
-            query_dataloader = get_data_loader(task_train, num_per_class=args.batch_size_train, split='query',
-                                               shuffle=True, rotation=degrees)
-            val_dataloader = get_data_loader(task_train, num_per_class=args.val_num_train, split='val',
-                                             shuffle=True,
-                                             rotation=degrees)
-
-            if (episode + 1) % args.val_interval != 0:
-                del val_dataloader
-
-            # sample data
-            supports, supports_labels = support_dataloader.__iter__().next()
-            queries, queries_labels = query_dataloader.__iter__().next()
-            queries_labels = queries_labels.cuda()
-
-            # calculate features
-            supports_features = controller(Variable(supports).cuda())  # will be stored in the key memory
-            queries_features = controller(Variable(queries).cuda())
-
-            # quantization
-            if args.quantization_learn == 1:
-                supports_features = torch.sign(supports_features)
-
-            # add(rewrite) memory-augmented memory
-            kv_mem = KeyValueMemory(supports_features, supports_labels)
-            kv = kv_mem.kv
-
-            del support_dataloader, query_dataloader, supports, supports_labels, supports_features, queries
-
-            # predict
-            if args.sim_cal == 'cos_softabs':
-                prediction1 = sim_comp(kv, queries_features)
-            elif args.sim_cal == 'cos_softmax':
-                prediction1 = sim_comp_softmax(kv, queries_features)
-            elif args.sim_cal == 'dot_abs':
-                prediction1 = sim_comp_approx(kv, queries_features, binary_id=args.binary_id)
-
-            del queries_features
-
-            predict_labels1 = torch.argmax(prediction1.data, 1).cuda()
-            rewards1 = [1 if predict_labels1[j] == queries_labels[j]
-                        else 0 for j in range(args.class_num * args.batch_size_train)]
-            total_rewards1 += np.sum(rewards1)
-            loss = criterion(prediction1, queries_labels.cuda())
-
-            # Update
-            controller.zero_grad()
-            loss.backward()
-            optimizer.step()
-            lr_scheduler.step()
-
-            # log the training process
-            if (episode + 1) % args.log_interval == 0:
-                logger.info('episode:{}, loss:{:.2f}'.format(episode + 1, loss.item()))
-
-            ######################
-            #     Validation
-            ######################
-            if (episode + 1) % args.val_interval == 0:
-
-                logger.info('-------- Validation --------')
-                total_rewards2 = 0
-
-                for i in range(args.val_episode):
-                    degrees = random.choice([0, 90, 180, 270])
-
-                    val_images, val_labels = val_dataloader.__iter__().next()
-                    val_labels = val_labels.cuda()
-
-                    # calculate features
-                    val_features = controller(Variable(val_images).cuda())
-
-                    del val_images
-
-                    # quantization
-                    if args.quantization_learn == 1:
-                        val_features = torch.sign(val_features)
-
-                    # predict
-                    if args.sim_cal == 'cos_softabs':
-                        prediction2 = sim_comp(kv, val_features)
-                    elif args.sim_cal == 'cos_softmax':
-                        prediction2 = sim_comp_softmax(kv, val_features)
-                    elif args.sim_cal == 'dot_abs':
-                        prediction2 = sim_comp_approx(kv, val_features, binary_id=args.binary_id)
-
-                    predict_labels2 = torch.argmax(prediction2.data, 1).cuda()
-
-                    del val_features
-
-                    rewards2 = [1 if predict_labels2[j] == val_labels[j]
-                                else 0 for j in range(args.class_num * args.val_num_train)]
-                    total_rewards2 += np.sum(rewards2)
-
-                val_accuracy = total_rewards2 / 1.0 / (args.val_episode * args.class_num * args.val_num_train)
-                logger.info('Validation accuracy: {:.2f}%.'.format(val_accuracy * 100))
-
-                # save the best performance controller
-                is_best = False
-                if val_accuracy > best_accuracy:
-                    is_best = True
-                    best_accuracy = val_accuracy
-                    logger.info('Save controller for episode: {}.'.format(episode + 1))
-                logger.info('----------------------------')
-                save_checkpoint({
-                    'episode': episode,
-                    'state_dict': controller.state_dict(),
-                    'best_acc': best_accuracy,
-                    'optimizer': optimizer.state_dict(),
-                }, is_best, args.log_dir)
-
-            del kv_mem
-
-        train_accuracy = total_rewards1 / 1.0 / (args.train_episode * args.class_num * args.batch_size_train)
-        logger.info(' ')
-        logger.info('========> Training finished!')
-        logger.info('Training accuracy: {:.2f}%.'.format(train_accuracy * 100))
-        logger.info(' ')
-
-    ######################
-    #        Test
-    ######################
-    total_rewards3 = 0
-
-    if args.test_only == 0:
-        # Test (Training finished)
-        logger.info('========> Use the best performance Controller to test...')
-        ckpt = torch.load(os.path.join(args.log_dir, 'model_best.pth.tar'))
-        controller.load_state_dict(ckpt['state_dict'])
-
-    if args.test_only == 1:
-        # Test (Use pretrained parameters)
-        logger.info('========> Use a pretrained Controller to test...')
-        ckpt = torch.load(args.pretrained_dir)
-        controller.load_state_dict(ckpt['state_dict'])
-
-    for i in range(args.test_episode):
-        degrees = random.choice([0, 90, 180, 270])
-        task_test = OmniglotTask(manntest_character_folders, args.class_num, args.num_shot, args.pool_query_test,
-                                 val_num=0)
-        support_dataloader2 = get_data_loader(task_test, num_per_class=args.num_shot, split='train', shuffle=False,
-                                              rotation=degrees)  # support vectors for testing / validation
-        query_dataloader2 = get_data_loader(task_test, num_per_class=args.batch_size_test, split='query', shuffle=True,
-                                            rotation=degrees)  # queries for testing / validation
-
-        supports_images2, supports_labels2 = support_dataloader2.__iter__().next()
-        queries_images2, queries_labels2 = query_dataloader2.__iter__().next()
-        queries_labels2 = queries_labels2.cuda()
-
-        # calculate features
-        supports_features2 = controller(Variable(supports_images2).cuda())
-        queries_features2 = controller(Variable(queries_images2).cuda())
-
-        # quantization
-        if args.quantization_infer == 1:
-            if args.binary_id == 1:  # {-1, 1}
-                supports_features2 = torch.sign(supports_features2)
-                queries_features2 = torch.sign(queries_features2)
-            elif args.binary_id == 2:  # {0, 1}
-                supports_features2 = torch.sign(supports_features2)
-                supports_features2 = (supports_features2 + 1) / 2
-                queries_features2 = torch.sign(queries_features2)
-                queries_features2 = (queries_features2 + 1) / 2
-
-        # add(rewrite) memory-augmented memory
-        kv_mem = KeyValueMemory(supports_features2, supports_labels2)
-        kv = kv_mem.kv
-
-        # predict (approx)
-        prediction3 = sim_comp_approx(kv, queries_features2, binary_id=args.binary_id)
-
-        del support_dataloader2, query_dataloader2, supports_images2, supports_features2, queries_images2, queries_features2
-
-        predict_labels3 = torch.argmax(prediction3.data, 1).cuda()
-        rewards3 = [1 if predict_labels3[j] == queries_labels2[j]
-                    else 0 for j in range(args.class_num * args.batch_size_test)]
-        total_rewards3 += np.sum(rewards3)
-
-        del kv_mem
-
-    test_accuracy = total_rewards3 / 1.0 / (args.test_episode * args.class_num * args.batch_size_test)
-    logger.info('Testing accuracy: {:.2f}%.'.format(test_accuracy * 100))
-
-
-if __name__ == '__main__':
-    main()
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.autograd import Variable, Function
+from torch.optim.lr_scheduler import StepLR
+import torch.backends.cudnn as cudnn
+import numpy as np
+import os
+import logging.config
+import math
+import argparse
+import random
+import time, datetime
+import os
+import shutil
+
+from utils.mann import *
+from utils.mann_approx import *
+from utils.mann_binary import *
+from data.dataset import *
+from data.data_loading import *
+from model.controller import *
+from quant.XNOR_module import *
+from model.quantized_controller import *
+
+# argparse
+parser = argparse.ArgumentParser('MANN for Few-Shot Learning')
+
+# log path
+parser.add_argument(
+    '--log_dir',
+    type=str,
+    help='The path to store the training log file.')
+
+# data path
+parser.add_argument(
+    '--data_dir',
+    type=str,
+    help='The path to the dataset, shold be a absolute path')
+
+parser.add_argument(
+    '--cache_dir',
+    type=str,
+    default=None,
+    help='The path to the images preprocessed by data/preprocess_omniglot.py, None reads the image files.')
+
+parser.add_argument(
+    '--manifest_path',
+    type=str,
+    default=None,
+    help='A json file to persist the directory index of the dataset, None builds it in memory for each run.')
+
+parser.add_argument(
+    '--cache_mmap',
+    type=int,
+    default=1,
+    choices={0, 1},
+    help='Memory-map the preprocessed images (shared page cache) or load them into memory.')
+
+# controller structure
+parser.add_argument(
+    '--input_channel',
+    type=int,
+    default=1,
+    help='The number of channels of the input.')
+
+parser.add_argument(
+    '--feature_dim',
+    type=int,
+    default=512,
+    help='The dimension of the feature vectors generated by the controller.')
+
+# m-way, n-shot problem
+parser.add_argument(
+    '--class_num',
+    type=int,
+    default=5,
+    help='Number of classes used in the MANN training.')
+
+parser.add_argument(
+    '--num_shot',
+    type=int,
+    default=5,
+    help='Number of samples per class.')
+
+# data sampling for training data
+parser.add_argument(
+    '--pool_query_train',
+    type=int,
+    default=10,
+    help='(Training phase) Number of samples that will be reserved for sampling queries')
+
+parser.add_argument(
+    '--pool_val_train',
+    type=int,
+    default=5,
+    help='(Training phase) Number of samples that will be reserved for sampling validation samples')
+
+parser.add_argument(
+    '--batch_size_train',
+    type=int,
+    default=15,
+    help='(Training phase) Number of queries per class.')
+
+parser.add_argument(
+    '--val_num_train',
+    type=int,
+    default=3,
+    help='(Training phase) Number of samples used to do validation.')
+
+# data sampling for testing data
+parser.add_argument(
+    '--pool_query_test',
+    type=int,
+    default=10,
+    help='(Inference phase) Number of samples that will be reserved for sampling queries')
+
+parser.add_argument(
+    '--batch_size_test',
+    type=int,
+    default=15,
+    help='(Inference phase) Number of queries per class.')
+
+# episode & log interval
+parser.add_argument(
+    '--train_episode',
+    type=int,
+    default=1000,
+    help='Number of episode to train the controller.')
+
+parser.add_argument(
+    '--episode_batch',
+    type=int,
+    default=1,
+    help='Number of episodes stacked into one forward pass and optimizer step during training.')
+
+parser.add_argument(
+    '--log_interval',
+    type=int,
+    default=10,
+    help='Intervals to print the training process.')
+
+parser.add_argument(
+    '--val_episode',
+    type=int,
+    default=250,
+    help='Number of episode to validate the controller.')
+
+parser.add_argument(
+    '--val_interval',
+    type=int,
+    default=200,
+    help='Intervals to validate the controller.')
+
+parser.add_argument(
+    '--test_episode',
+    type=int,
+    default=1000,
+    help='Number of episode to test the mature controller.')
+
+parser.add_argument(
+    '--feature_bank',
+    type=int,
+    default=0,
+    choices={0, 1},
+    help='Embed the testing images once per rotation and sample the testing episodes from the features '
+         '(requires --cache_dir).')
+
+parser.add_argument(
+    '--test_episode_batch',
+    type=int,
+    default=10,
+    help='Number of episodes evaluated at once in the inference phase.')
+
+# optimizer
+parser.add_argument(
+    '--learning_rate',
+    type=float,
+    default=1e-3,
+    help='Initial learning rate.')
+
+# quantizatoin
+parser.add_argument(
+    '--quantization_learn',
+    type=str,
+    default='No',
+    choices={'No', 'XNOR', 'XNOR_binary_fc'},
+    help='Binarize the Controller or not.')
+
+parser.add_argument(
+    '--quantization_infer',
+    type=int,
+    default=0,
+    choices={0, 1},
+    help='Binarize the features or not.')
+
+parser.add_argument(
+    '--prototype',
+    type=int,
+    default=0,
+    choices={0, 1},
+    help='Bundle the shots of each class into one key (sum, or majority of the bits) in the inference phase.')
+
+parser.add_argument(
+    '--packed_keys',
+    type=int,
+    default=0,
+    choices={0, 1},
+    help='Store the binarized keys bit-packed (64 dimensions per int64 word) in the inference phase.')
+
+parser.add_argument(
+    '--int8',
+    type=int,
+    default=0,
+    choices={0, 1},
+    help='Also test the full-precision Controller after int8 static quantization (on CPU), on the same episodes.')
+
+parser.add_argument(
+    '--calibration_episode',
+    type=int,
+    default=10,
+    help='Number of training episodes whose support images calibrate the int8 Controller.')
+
+# RBNN setting
+parser.add_argument(
+    '--rotation_update',
+    default=1,
+    type=int,
+    metavar='N',
+    help='interval of updating rotation matrix (default:1)')
+
+parser.add_argument(
+    '--a32',
+    default=1,
+    type=int,
+    choices={0, 1},
+    help='w1a32')
+
+# test pretrain or not
+parser.add_argument(
+    '--test_only',
+    type=int,
+    default=0,
+    choices={0, 1},
+    help='Use a pretrained Controller or not.')
+
+parser.add_argument(
+    '--pretrained_dir',
+    type=str,
+    default=None,
+    help='The path to the pretrained ckpt.')
+
+# choose the scheme to calculate similarity
+parser.add_argument(
+    '--sim_cal',
+    type=str,
+    default='softabs',
+    choices={'cos_softabs', 'cos_softmax', 'dot_abs'},
+    help='The scheme to calculate similarity.')
+
+# binary or bipolar
+parser.add_argument(
+    '--binary_id',
+    type=int,
+    default=1,
+    choices={1, 2},
+    help='choose binary (binary-1, {-1, 1}) or bipolar (binary-2, {0, 1}).')
+
+# resume
+parser.add_argument(
+    '--resume',
+    action='store_true',
+    help='whether continue training from the same directory', )
+
+# gpu
+parser.add_argument(
+    '--gpu',
+    type=str,
+    default='0',
+    help='Select gpu to use.')
+
+# device
+parser.add_argument(
+    '--device',
+    type=str,
+    default='cuda',
+    help='Device to run the MANN on, e.g. cuda, cuda:1 or cpu.')
+
+parser.add_argument(
+    '--num_threads',
+    type=int,
+    default=0,
+    help='Number of CPU threads used by torch, 0 keeps the torch default.')
+
+args = parser.parse_args()
+
+
+# set up logger
+def get_logger(file_path):
+    logger = logging.getLogger('gal')
+    log_format = '%(asctime)s | %(message)s'
+    formatter = logging.Formatter(log_format, datefmt='%m/%d %I:%M:%S %p')
+    file_handler = logging.FileHandler(file_path)
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    logger.addHandler(file_handler)
+    logger.addHandler(stream_handler)
+    logger.setLevel(logging.INFO)
+
+    return logger
+
+
+# deal with the single-multi GPU problem
+def match_state_dict(controller, state_dict):
+    new_state_dic = OrderedDict()
+    prefix = 'module.' if isinstance(controller, nn.DataParallel) else ''
+    for k, v in state_dict.items():
+        new_state_dic[prefix + k.replace('module.', '')] = v
+
+    return new_state_dic
+
+
+# main
+def main():
+    device = torch.device(args.device)
+    if device.type == 'cuda':
+        cudnn.benchmark = True
+        cudnn.enabled = True
+    if args.num_threads > 0:
+        torch.set_num_threads(args.num_threads)
+
+    # make the log directory and log the args
+    if not os.path.isdir(args.log_dir):
+        os.makedirs(args.log_dir)
+    now = datetime.datetime.now().strftime('%Y-%m-%d-%H:%M:%S')
+    logger = get_logger(os.path.join(args.log_dir, 'logger' + now + '.log'))
+    logger.info("args = %s", args)
+    logger.info('-' * 50)
+
+    # init the data folder ...
+    logger.info("========> Initialize data folders...")
+    # init character folders for dataset construction
+    cache = OmniglotCache(args.cache_dir, mmap=args.cache_mmap == 1) if args.cache_dir is not None else None
+    manifest = omniglot_manifest(args.data_dir, args.manifest_path) if cache is None else None
+    manntrain_character_folders, manntest_character_folders = omniglot_character_folders(data_path=args.data_dir,
+                                                                                         cache=cache,
+                                                                                         manifest=manifest)
+
+    if args.feature_bank == 1 and cache is None:
+        raise ValueError('--feature_bank 1 requires the preprocessed images, see --cache_dir.')
+    if args.int8 == 1 and (args.quantization_learn != 'No' or args.feature_bank == 1):
+        raise ValueError('--int8 1 requires --quantization_learn No and --feature_bank 0.')
+
+    # sample the episodes from the preprocessed images with tensor operations
+    if cache is not None:
+        train_sampler = EpisodeSampler(cache, manntrain_character_folders)
+        test_sampler = EpisodeSampler(cache, manntest_character_folders)
+
+    # init the controller ...
+    logger.info("========> Build and Initialize the Controller...")
+    controller = Controller(num_in_channels=args.input_channel, feature_dim=args.feature_dim,
+                            quant=args.quantization_learn)
+    logger.info(controller)
+    controller.to(device)
+    if device.type == 'cuda' and len(args.gpu) > 1:
+        device_id = []
+        for i in range((len(args.gpu) + 1) // 2):
+            device_id.append(i)
+        controller = nn.DataParallel(controller, device_ids=device_id).to(device)
+
+    if args.test_only == 0:
+        # define the optimizer
+        optimizer = torch.optim.Adam(controller.parameters(), lr=args.learning_rate)
+        lr_scheduler = StepLR(optimizer, step_size=100000, gamma=0.5)
+
+        # build graph
+        logger.info("========> Training...")
+
+        best_accuracy = 0.0
+
+        # loss function
+        criterion = nn.CrossEntropyLoss()
+        criterion = criterion.to(device)
+
+        total_rewards1 = 0
+        start_episode = 0
+
+        # resume
+        if args.resume:
+            logger.info('========> Loading checkpoint {} ...'.format(args.pretrained_dir))
+            ckpt = torch.load(args.pretrained_dir, map_location=device)
+            start_episode = ckpt['episode'] + 1
+            best_accuracy = ckpt['best_acc']
+
+            controller.load_state_dict(match_state_dict(controller, ckpt['state_dict']))
+            logger.info('loaded checkpoint {} episode = {}', format(args.pretrained_dir, start_episode))
+
+        ######################
+        #     Train
+        ######################
+        episode = start_episode
+        for episode in range(args.train_episode):
+
+            # init dataset
+            # sample_dataloader: obtain previous samples for compare
+            # batch_dataloader: batch samples for training
+            # args.episode_batch independent episodes are stacked into one step
+            supports, supports_labels, queries, queries_labels = [], [], [], []
+            for e in range(args.episode_batch):
+                degrees = random.choice([0, 90, 180, 270])  # data augmentation
+                if cache is not None:
+                    task_train = train_sampler.sample_task(args.class_num, args.num_shot, args.pool_query_train,
+                                                           val_num=args.pool_val_train)
+                else:
+                    task_train = OmniglotTask(manntrain_character_folders, args.class_num, args.num_shot,
+                                              args.pool_query_train, val_num=args.pool_val_train, manifest=manifest)
+                support_dataloader = get_data_loader(task_train, num_per_class=args.num_shot, split='train',
+                                                     shuffle=False, rotation=degrees)
+                query_dataloader = get_data_loader(task_train, num_per_class=args.batch_size_train, split='query',
+                                                   shuffle=True, rotation=degrees)
+
+                # validate on the first episode
+                if e == 0 and (episode + 1) % args.val_interval == 0:
+                    val_dataloader = get_data_loader(task_train, num_per_class=args.val_num_train, split='val',
+                                                     shuffle=True,
+                                                     rotation=degrees)
+
+                # sample data
+                support_images, support_labels = next(iter(support_dataloader))
+                query_images, query_labels = next(iter(query_dataloader))
+                supports.append(support_images)
+                supports_labels.append(support_labels)
+                queries.append(query_images)
+                queries_labels.append(query_labels)
+
+            supports = torch.cat(supports)  # [E * mn, c, h, w]
+            supports_labels = torch.stack(supports_labels)  # [E, mn]
+            queries = torch.cat(queries)  # [E * batch * m, c, h, w]
+            queries_labels = torch.cat(queries_labels).to(device)  # [E * batch * m]
+
+            # calculate features
+            supports_features = controller(Variable(supports).to(device))  # will be stored in the key memory
+            queries_features = controller(Variable(queries).to(device))
+
+            # quantization
+            if args.quantization_learn == 1:
+                supports_features = torch.sign(supports_features)
+
+            # add(rewrite) memory-augmented memory
+            if args.episode_batch == 1:
+                kv_mem = KeyValueMemory(supports_features, supports_labels[0])
+            else:
+                # one memory per episode, [E, mn, d]
+                kv_mem = BatchKeyValueMemory(supports_features.view(args.episode_batch, -1, args.feature_dim),
+                                             supports_labels)
+                queries_features = queries_features.view(args.episode_batch, -1, args.feature_dim)
+            kv = kv_mem
+
+            del support_dataloader, query_dataloader, supports, supports_labels, supports_features, queries
+
+            # predict
+            if args.sim_cal == 'cos_softabs':
+                prediction1 = sim_comp(kv, queries_features)
+            elif args.sim_cal == 'cos_softmax':
+                prediction1 = sim_comp_softmax(kv, queries_features)
+            elif args.sim_cal == 'dot_abs':
+                prediction1 = sim_comp_approx(kv, queries_features, binary_id=args.binary_id)
+
+            del queries_features
+
+            prediction1 = prediction1.view(-1, prediction1.size(-1))  # [E * batch * m, m]
+            predict_labels1 = torch.argmax(prediction1.data, 1)
+            total_rewards1 += (predict_labels1 == queries_labels).sum().item()
+            loss = criterion(prediction1, queries_labels)
+
+            # Update
+            controller.zero_grad()
+            loss.backward()
+            optimizer.step()
+            lr_scheduler.step()
+
+            # log the training process
+            if (episode + 1) % args.log_interval == 0:
+                logger.info('episode:{}, loss:{:.2f}'.format(episode + 1, loss.item()))
+
+            ######################
+            #     Validation
+            ######################
+            if (episode + 1) % args.val_interval == 0:
+
+                logger.info('-------- Validation --------')
+                total_rewards2 = 0
+                controller.eval()  # the quantized weights are frozen at inference
+                if isinstance(kv, BatchKeyValueMemory):
+                    kv = kv.episode(0)
+
+                with inference_mode():
+                    for i in range(args.val_episode):
+                        degrees = random.choice([0, 90, 180, 270])
+
+                        val_images, val_labels = next(iter(val_dataloader))
+                        val_labels = val_labels.to(device)
+
+                        # calculate features
+                        val_features = controller(Variable(val_images).to(device))
+
+                        del val_images
+
+                        # quantization
+                        if args.quantization_learn == 1:
+                            val_features = torch.sign(val_features)
+
+                        # predict
+                        if args.sim_cal == 'cos_softabs':
+                            prediction2 = sim_comp(kv, val_features)
+                        elif args.sim_cal == 'cos_softmax':
+                            prediction2 = sim_comp_softmax(kv, val_features)
+                        elif args.sim_cal == 'dot_abs':
+                            prediction2 = sim_comp_approx(kv, val_features, binary_id=args.binary_id)
+
+                        predict_labels2 = torch.argmax(prediction2.data, 1).to(device)
+
+                        del val_features
+
+                        rewards2 = [1 if predict_labels2[j] == val_labels[j]
+                                    else 0 for j in range(args.class_num * args.val_num_train)]
+                        total_rewards2 += np.sum(rewards2)
+                controller.train()
+
+                val_accuracy = total_rewards2 / 1.0 / (args.val_episode * args.class_num * args.val_num_train)
+                logger.info('Validation accuracy: {:.2f}%.'.format(val_accuracy * 100))
+
+                # save the best performance controller
+                is_best = False
+                if val_accuracy > best_accuracy:
+                    is_best = True
+                    best_accuracy = val_accuracy
+                    logger.info('Save controller for episode: {}.'.format(episode + 1))
+                logger.info('----------------------------')
+                save_checkpoint({
+                    'episode': episode,
+                    'state_dict': controller.state_dict(),
+                    'best_acc': best_accuracy,
+                    'optimizer': optimizer.state_dict(),
+                }, is_best, args.log_dir)
+
+            del kv_mem
+
+        train_accuracy = total_rewards1 / 1.0 / (args.train_episode * args.episode_batch * args.class_num *
+                                             args.batch_size_train)
+        logger.info(' ')
+        logger.info('========> Training finished!')
+        logger.info('Training accuracy: {:.2f}%.'.format(train_accuracy * 100))
+        logger.info(' ')
+
+    ######################
+    #        Test
+    ######################
+    if args.test_only == 0:
+        # Test (Training finished)
+        logger.info('========> Use the best performance Controller to test...')
+        ckpt = torch.load(os.path.join(args.log_dir, 'model_best.pth.tar'), map_location=device)
+        controller.load_state_dict(match_state_dict(controller, ckpt['state_dict']))
+
+    if args.test_only == 1:
+        # Test (Use pretrained parameters)
+        logger.info('========> Use a pretrained Controller to test...')
+        ckpt = torch.load(args.pretrained_dir, map_location=device)
+        controller.load_state_dict(match_state_dict(controller, ckpt['state_dict']))
+
+    # the quantized weights are frozen at inference
+    controller.eval()
+
+    # the Controllers to test on the same episodes, and their devices
+    test_controllers = [('float', controller, device)]
+    if args.int8 == 1:
+        logger.info('========> Calibrate the int8 Controller on the support images of {} training episodes...'.format(
+            args.calibration_episode))
+        calibration_images = []
+        for _ in range(args.calibration_episode):
+            degrees = random.choice([0, 90, 180, 270])
+            if cache is not None:
+                task_calibration = train_sampler.sample_task(args.class_num, args.num_shot, args.pool_query_test,
+                                                             val_num=0)
+            else:
+                task_calibration = OmniglotTask(manntrain_character_folders, args.class_num, args.num_shot,
+                                                args.pool_query_test, val_num=0, manifest=manifest)
+            support_dataloader = get_data_loader(task_calibration, num_per_class=args.num_shot, split='train',
+                                                 shuffle=False, rotation=degrees)
+            calibration_images.append(next(iter(support_dataloader))[0])
+        test_controllers.append(('int8', quantize_controller(controller, calibration_images), torch.device('cpu')))
+
+    start_time = time.time()
+
+    # embed every testing image once per rotation
+    feature_bank = None
+    if args.feature_bank == 1:
+        logger.info('========> Embed the testing images into the feature bank...')
+        with inference_mode():
+            feature_bank = FeatureBank(controller, test_sampler, device, binarize=args.quantization_infer == 1)
+
+    test_accuracies = {name: [] for name, _, _ in test_controllers}
+    test_times = {name: 0 for name, _, _ in test_controllers}
+    with inference_mode():
+        # args.test_episode_batch episodes are evaluated at once
+        for i in range(0, args.test_episode, args.test_episode_batch):
+            num_episode = min(args.test_episode_batch, args.test_episode - i)
+            supports_images2, supports_labels2, queries_images2, queries_labels2 = [], [], [], []
+            for e in range(num_episode):
+                degrees = random.choice([0, 90, 180, 270])
+                if cache is not None:
+                    task_test = test_sampler.sample_task(args.class_num, args.num_shot, args.pool_query_test,
+                                                         val_num=0)
+                else:
+                    task_test = OmniglotTask(manntest_character_folders, args.class_num, args.num_shot,
+                                             args.pool_query_test, val_num=0, manifest=manifest)
+                if feature_bank is not None:
+                    # the features of the images are gathered from the bank
+                    support_images, support_labels = feature_bank.get_batch(task_test.train_ids, args.num_shot,
+                                                                             shuffle=False, rotation=degrees)
+                    query_images, query_labels = feature_bank.get_batch(task_test.test_ids, args.batch_size_test,
+                                                                        shuffle=True, rotation=degrees)
+                else:
+                    support_dataloader2 = get_data_loader(task_test, num_per_class=args.num_shot, split='train',
+                                                          shuffle=False,
+                                                          rotation=degrees)  # support vectors for testing / validation
+                    query_dataloader2 = get_data_loader(task_test, num_per_class=args.batch_size_test, split='query',
+                                                        shuffle=True,
+                                                        rotation=degrees)  # queries for testing / validation
+
+                    support_images, support_labels = next(iter(support_dataloader2))
+                    query_images, query_labels = next(iter(query_dataloader2))
+                supports_images2.append(support_images)
+                supports_labels2.append(support_labels)
+                queries_images2.append(query_images)
+                queries_labels2.append(query_labels)
+
+            supports_labels2 = torch.stack(supports_labels2)  # [E, mn]
+            queries_labels2 = torch.stack(queries_labels2).to(device)  # [E, batch * m]
+
+            for name, test_controller, test_device in test_controllers:
+                test_start_time = time.time()
+
+                # calculate features, [E, mn, d] and [E, batch * m, d]
+                if feature_bank is not None:
+                    supports_features2 = torch.cat(supports_images2)
+                    queries_features2 = torch.cat(queries_images2)
+                else:
+                    supports_features2 = test_controller(torch.cat(supports_images2).to(test_device)).to(device)
+                    queries_features2 = test_controller(torch.cat(queries_images2).to(test_device)).to(device)
+                supports_features2 = supports_features2.view(num_episode, -1, supports_features2.size(-1))
+                queries_features2 = queries_features2.view(num_episode, -1, queries_features2.size(-1))
+
+                # quantization
+                if args.quantization_infer == 1:
+                    if args.binary_id == 1:  # {-1, 1}
+                        supports_features2 = torch.sign(supports_features2)
+                        queries_features2 = torch.sign(queries_features2)
+                    elif args.binary_id == 2:  # {0, 1}
+                        supports_features2 = torch.sign(supports_features2)
+                        supports_features2 = (supports_features2 + 1) / 2
+                        queries_features2 = torch.sign(queries_features2)
+                        queries_features2 = (queries_features2 + 1) / 2
+
+                # one prototype key per class, [E, m, d]
+                supports_keys2, supports_values2 = supports_features2, supports_labels2
+                if args.prototype == 1:
+                    supports_keys2, supports_values2 = bundle_prototypes(
+                        supports_features2, supports_labels2, args.class_num,
+                        binary_id=args.binary_id if args.quantization_infer == 1 else None)
+
+                # add(rewrite) memory-augmented memory & predict (approx)
+                if args.quantization_infer == 1 and args.packed_keys == 1:
+                    # bit-packed keys, unpacked for the similarity matmul
+                    kv_mem = BatchBinaryKeyValueMemory(supports_keys2, supports_values2)
+                    kv = kv_mem
+                    prediction3 = sim_comp_binary(kv, queries_features2, binary_id=args.binary_id)
+                else:
+                    kv_mem = BatchKeyValueMemory(supports_keys2, supports_values2)
+                    kv = kv_mem
+                    prediction3 = sim_comp_approx(kv, queries_features2, binary_id=args.binary_id)
+
+                del supports_features2, queries_features2
+
+                # accuracy of each episode
+                predict_labels3 = torch.argmax(prediction3, -1)  # [E, batch * m]
+                test_accuracies[name].append((predict_labels3 == queries_labels2).float().mean(1).cpu())
+                test_times[name] += time.time() - test_start_time
+
+                del kv_mem
+
+            del supports_images2, queries_images2
+
+    test_accuracy, test_interval = mean_confidence_interval(torch.cat(test_accuracies['float']))
+    logger.info('Testing accuracy: {:.2f}% +- {:.2f}% (95% confidence interval).'.format(test_accuracy * 100,
+                                                                                        test_interval * 100))
+    # the float Controller only: the int8 calibration is done before start_time, its evaluation is left out
+    test_time = time.time() - start_time - sum(t for name, t in test_times.items() if name != 'float')
+    logger.info('Testing time: {:.2f}s ({:.2f} episodes/s on {}).'.format(test_time, args.test_episode / test_time,
+                                                                           device))
+
+    # the int8 Controller versus the float one, on the same episodes
+    if args.int8 == 1:
+        for name, _, test_device in test_controllers:
+            accuracy, interval = mean_confidence_interval(torch.cat(test_accuracies[name]))
+            logger.info('{} Controller on {}: {:.2f}% +- {:.2f}%, {:.2f}s to embed and predict.'.format(
+                name, test_device, accuracy * 100, interval * 100, test_times[name]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+from collections import OrderedDict
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from utils.mann_binary import unpack_bits
+
+
+def strip_module_prefix(state_dict):
+    """ Remove the 'module.' prefix added by nn.DataParallel, if any. """
+    return OrderedDict((k[len('module.'):] if k.startswith('module.') else k, v) for k, v in state_dict.items())
+
+
+def standardize(x, dims):
+    x = x - x.mean(dims, keepdim=True)
+    return x / x.std(dims, keepdim=True)
+
+
+class FrozenConv2d(nn.Module):
+    """ A full-precision or 8-bit convolution. """
+
+    def __init__(self, layer):
+        super(FrozenConv2d, self).__init__()
+        weight = layer['codes'].float().div(127).mul(layer['max']) if 'codes' in layer else layer['weight']
+        self.register_buffer('weight', weight)
+        self.register_buffer('bias', layer['bias'])
+        self.stride, self.padding = layer['stride'], layer['padding']
+
+    def forward(self, x):
+        return F.conv2d(x, self.weight, self.bias, self.stride, self.padding)
+
+
+class FrozenLinear(nn.Module):
+    """ A full-precision or 8-bit FC layer. """
+
+    def __init__(self, layer):
+        super(FrozenLinear, self).__init__()
+        weight = layer['codes'].float().div(127).mul(layer['max']) if 'codes' in layer else layer['weight']
+        self.register_buffer('weight', weight)
+        self.register_buffer('bias', layer['bias'])
+
+    def forward(self, x):
+        return F.linear(x, self.weight, self.bias)
+
+
+class FrozenBinaryConv2d(nn.Module):
+    """
+    A binarized convolution (XNOR or RBNN), the packed weights are unpacked to {-1, 1} once.
+    """
+
+    def __init__(self, layer):
+        super(FrozenBinaryConv2d, self).__init__()
+        self.in_channels, self.kernel_size, self.stride = layer['in_channels'], layer['kernel_size'], layer['stride']
+        self.binary_input = layer['binary_input']
+
+        weight = layer['weight']  # [c_out, h * w * words]
+        weight = weight.view(weight.size(0), self.kernel_size[0], self.kernel_size[1], -1)
+        weight = unpack_bits(weight, self.in_channels).permute(0, 3, 1, 2).contiguous()
+        self.register_buffer('weight', weight)
+        self.register_buffer('bias', layer['bias'])
+        self.register_buffer('alpha', layer['alpha'])
+
+    def forward(self, x):
+        x = standardize(x, [1, 2, 3])
+        if self.binary_input:
+            x = torch.sign(x)
+        output = F.conv2d(x, self.weight, self.bias, self.stride)
+
+        return output * self.alpha
+
+
+class FrozenBinaryLinear(nn.Module):
+    """ A binarized FC layer (XNOR or RBNN), see FrozenBinaryConv2d. """
+
+    def __init__(self, layer):
+        super(FrozenBinaryLinear, self).__init__()
+        self.binary_input = layer['binary_input']
+
+        weight = unpack_bits(layer['weight'], layer['in_features'])  # [out_features, in_features]
+        self.register_buffer('weight', weight)
+        self.register_buffer('bias', layer['bias'])
+        self.register_buffer('alpha', layer['alpha'])
+
+    def forward(self, x):
+        x = standardize(x, [1])
+        if self.binary_input:
+            x = torch.sign(x)
+        output = F.linear(x, self.weight, self.bias)
+
+        return output * self.alpha
+
+
+def frozen_layer(layer):
+    if layer['layer'] == 'binary_conv':
+        return FrozenBinaryConv2d(layer)
+    if layer['layer'] == 'binary_linear':
+        return FrozenBinaryLinear(layer)
+    if layer['layer'] == 'conv':
+        return FrozenConv2d(layer)
+    if layer['layer'] == 'linear':
+        return FrozenLinear(layer)
+    if layer['layer'] == 'relu':
+        return nn.ReLU()
+    if layer['layer'] == 'maxpool':
+        return nn.MaxPool2d(layer['kernel_size'], stride=layer['stride'])
+
+    raise ValueError('Unknown layer {}.'.format(layer['layer']))
+
+
+class FrozenController(nn.Module):
+    """ The inference-only Controller rebuilt from an artifact of export_controller (model/frozen_export.py). """
+
+    def __init__(self, artifact):
+        super(FrozenController, self).__init__()
+        self.quant = artifact['quant']
+        self.feature_dim = artifact['feature_dim']
+        self.features = nn.Sequential(*[frozen_layer(layer) for layer in artifact['features']])
+        self.fc1 = frozen_layer(artifact['fc1'])
+
+    def forward(self, x):
+        """ Forward pass to generate the feature vectors with required dimension. """
+        x = self.features(x)
+        x = x.view(x.size(0), -1)
+        x = self.fc1(x)
+
+        return x
+
+
+def load_controller(path, device='cpu'):
+    """ Load an artifact of export_controller as a FrozenController in eval mode. """
+    artifact = torch.load(path, map_location='cpu')
+    controller = FrozenController(artifact).to(device)
+
+    return controller.eval()
+
+
+def trace_controller(controller, example, path=None):
+    """
+    Trace a FrozenController into a frozen TorchScript module, which is loaded
+    with torch.jit.load only, without this repository. The graph has no Python control flow, so it
+    holds for any batch size.
+
+    Input:
+    - controller: a FrozenController.
+    - example: a tensor, which is of size [N, num_in_channels, 32, 32], an input to trace with.
+    - path: a str, the file to save the TorchScript module to, optional.
+    """
+    with torch.no_grad():
+        traced = torch.jit.freeze(torch.jit.trace(controller.eval(), example))
+
+    if path is not None:
+        torch.jit.save(traced, path)
+
+    return traced
+
+
+def load_traced_controller(path, device='cpu', optimize=True):
+    """
+    Load a TorchScript module of trace_controller. With optimize, the graph is specialized for the
+    device by torch.jit.optimize_for_inference (e.g. conv + ReLU fused with oneDNN on CPU), which is
+    done after loading since the optimized graph is not portable.
+    """
+    traced = torch.jit.load(path, map_location=device)
+    if optimize:
+        traced = torch.jit.optimize_for_inference(traced)
+
+    return traced
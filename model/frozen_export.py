@@ -0,0 +1,90 @@
+import torch
+import torch.nn as nn
+from quant.XNOR_module import XNOR_BinarizeConv2d, binary_last_fc, first_conv, last_fc
+from quant.RBNN_modules import BinarizeConv2d, Binarize_last_fc
+from quant.binary_ops import pack_conv_weight
+from utils.mann_binary import pack_bits
+
+
+def quantize_8bit(w):
+    """
+    The integer codes of the 8-bit weights of first_conv / last_fc, the weights are codes / 127 * max.
+    The codes are int8 unless min(w) < -128 / 127 * max(w), then they are stored as int16.
+    """
+    max = w.max()
+    codes = w.div(max).mul(127).round()
+    dtype = torch.int8 if codes.min() >= -128 else torch.int16
+
+    return codes.to(dtype), max
+
+
+def export_layer(m):
+    """
+    Fold the quantization of a layer of the Controller into static tensors, see FrozenController. The
+    binarized weights are stored as bits, so a weight whose sign is exactly 0 is restored as -1.
+    """
+    if isinstance(m, (XNOR_BinarizeConv2d, BinarizeConv2d)):
+        assert m.padding == (0, 0) and m.dilation == (1, 1) and m.groups == 1
+        return {'layer': 'binary_conv', 'weight': pack_conv_weight(m.binarize_weight()),
+                'in_channels': m.in_channels, 'kernel_size': m.kernel_size, 'stride': m.stride,
+                'bias': m.bias, 'alpha': m.alpha,
+                'binary_input': isinstance(m, XNOR_BinarizeConv2d) or m.a32 == 0}
+    if isinstance(m, (binary_last_fc, Binarize_last_fc)):
+        return {'layer': 'binary_linear', 'weight': pack_bits(m.binarize_weight()), 'in_features': m.in_features,
+                'bias': m.bias, 'alpha': m.alpha,
+                'binary_input': isinstance(m, binary_last_fc) or m.a32 == 0}
+    if isinstance(m, nn.Conv2d):
+        layer = {'layer': 'conv', 'bias': m.bias, 'stride': m.stride, 'padding': m.padding}
+        if isinstance(m, first_conv):
+            layer['codes'], layer['max'] = quantize_8bit(m.weight)
+        else:
+            layer['weight'] = m.weight
+        return layer
+    if isinstance(m, nn.Linear):
+        layer = {'layer': 'linear', 'bias': m.bias}
+        if isinstance(m, last_fc):
+            layer['codes'], layer['max'] = quantize_8bit(m.weight)
+        else:
+            layer['weight'] = m.weight
+        return layer
+    if isinstance(m, nn.ReLU):
+        return {'layer': 'relu'}
+    if isinstance(m, nn.MaxPool2d):
+        return {'layer': 'maxpool', 'kernel_size': m.kernel_size, 'stride': m.stride}
+
+    raise ValueError('Cannot export the layer {}.'.format(type(m).__name__))
+
+
+def export_controller(controller, quant, path=None):
+    """
+    Export a Controller (any quant mode) as a frozen artifact: the binarized weights are bit-packed
+    (1 bit per weight), the 8-bit weights of the XNOR Controllers are stored as integer codes and the
+    full-precision layers as they are. Nothing of the training (optimizer, RBNN rotations) is kept.
+
+    Input:
+    - controller: a Controller, or a nn.DataParallel of it.
+    - quant: a str, the quant mode of the Controller.
+    - path: a str, the file to save the artifact to, optional.
+
+    Output:
+    - a dict, the artifact loaded by FrozenController.
+    """
+    if isinstance(controller, nn.DataParallel):
+        controller = controller.module
+
+    def detach(layer):
+        return {k: v.detach().cpu().clone() if torch.is_tensor(v) else v for k, v in layer.items()}
+
+    with torch.no_grad():
+        artifact = {
+            'quant': quant,
+            'num_in_channels': controller.features.conv1.in_channels,
+            'feature_dim': controller.fc1.out_features,
+            'features': [detach(export_layer(m)) for m in controller.features],
+            'fc1': detach(export_layer(controller.fc1)),
+        }
+
+    if path is not None:
+        torch.save(artifact, path)
+
+    return artifact
@@ -0,0 +1,61 @@
+import copy
+import torch
+import torch.nn as nn
+
+try:
+    import torch.ao.quantization as tq  # torch >= 1.10
+except ImportError:
+    import torch.quantization as tq
+
+
+class Int8Controller(nn.Module):
+    """ The full-precision (quant='No') Controller between the (de)quantization stubs of static quantization. """
+
+    def __init__(self, controller):
+        super(Int8Controller, self).__init__()
+        self.quant = tq.QuantStub()
+        self.features = copy.deepcopy(controller.features)
+        self.fc1 = copy.deepcopy(controller.fc1)
+        self.dequant = tq.DeQuantStub()
+
+    def forward(self, x):
+        x = self.quant(x)
+        x = self.features(x)
+        x = x.reshape(x.size(0), -1)
+        x = self.fc1(x)
+
+        return self.dequant(x)
+
+
+def quantize_controller(controller, calibration_images, backend='fbgemm'):
+    """
+    Post-training static int8 quantization of a full-precision Controller: conv + ReLU are fused, the
+    ranges of the activations are calibrated on calibration_images, then the weights and activations
+    are converted to int8. The quantized Controller runs on CPU and outputs float features.
+
+    Input:
+    - controller: a Controller with quant='No', or a nn.DataParallel of it.
+    - calibration_images: an iterable of tensors, which are of size [N, num_in_channels, 32, 32].
+    - backend: a str, the quantized engine, 'fbgemm' (x86) or 'qnnpack' (ARM).
+
+    Output:
+    - an Int8Controller.
+    """
+    if isinstance(controller, nn.DataParallel):
+        controller = controller.module
+
+    torch.backends.quantized.engine = backend
+    model = Int8Controller(controller).cpu().eval()
+    model.qconfig = tq.get_default_qconfig(backend)
+    tq.fuse_modules(model, [['features.conv{}'.format(i), 'features.relu{}'.format(i)] for i in range(1, 5)],
+                    inplace=True)
+    tq.prepare(model, inplace=True)
+
+    # calibrate the ranges of the activations
+    with torch.no_grad():
+        for x in calibration_images:
+            model(x.cpu())
+
+    tq.convert(model, inplace=True)
+
+    return model
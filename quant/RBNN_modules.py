@@ -5,9 +5,10 @@ import numpy as np
 import torch.nn.functional as F
 from torch.autograd import Function, Variable
 from scipy.stats import ortho_group
+from quant.binary_ops import FrozenWeight, frozen_weight
 
 
-class BinarizeConv2d(nn.Conv2d):
+class BinarizeConv2d(FrozenWeight, nn.Conv2d):
 
     def __init__(self, rotation_update, a32, *kargs, **kwargs):
         super(BinarizeConv2d, self).__init__(*kargs, **kwargs)
@@ -19,37 +20,35 @@ class BinarizeConv2d(nn.Conv2d):
 
         w = self.weight
         self.a, self.b = get_ab(np.prod(w.shape[1:]))
-        R1 = torch.tensor(ortho_group.rvs(dim=self.a)).float().cuda()
-        R2 = torch.tensor(ortho_group.rvs(dim=self.b)).float().cuda()
+        R1 = torch.tensor(ortho_group.rvs(dim=self.a)).float()
+        R2 = torch.tensor(ortho_group.rvs(dim=self.b)).float()
         self.register_buffer('R1', R1)
         self.register_buffer('R2', R2)
         self.Rweight = torch.ones_like(w)
 
         sw = w.abs().view(w.size(0), -1).mean(-1).float().view(w.size(0), 1, 1).detach()
-        self.alpha = nn.Parameter(sw.cuda(), requires_grad=True)
-        self.rotate = nn.Parameter(torch.ones(w.size(0), 1, 1, 1).cuda() * np.pi / 2, requires_grad=True)
+        self.alpha = nn.Parameter(sw, requires_grad=True)
+        self.rotate = nn.Parameter(torch.ones(w.size(0), 1, 1, 1) * np.pi / 2, requires_grad=True)
         self.Rotate = torch.zeros(1)
 
-    def forward(self, input):
-        a0 = input
+    def binarize_weight(self):
         w = self.weight
         w1 = w - w.mean([1, 2, 3], keepdim=True)
         w2 = w1 / w1.std([1, 2, 3], keepdim=True)
-        a1 = a0 - a0.mean([1, 2, 3], keepdim=True)
-        a2 = a1 / a1.std([1, 2, 3], keepdim=True)
         a, b = self.a, self.b
         X = w2.view(w.shape[0], a, b)
         if self.epoch > -1 and self.epoch % self.rotation_update == 0:
+            Xd = X.detach()  # [out_channels, a, b]
             for _ in range(3):
                 # * update B
-                V = self.R1.t() @ X.detach() @ self.R2
+                V = self.R1.t() @ Xd @ self.R2
                 B = torch.sign(V)
-                # * update R1
-                D1 = sum([Bi @ (self.R2.t()) @ (Xi.t()) for (Bi, Xi) in zip(B, X.detach())])
+                # * update R1, D1 = sum_i Bi @ R2^T @ Xi^T
+                D1 = torch.einsum('nab,ncb->ac', B @ self.R2.t(), Xd)
                 U1, S1, V1 = torch.svd(D1)
                 self.R1 = (V1 @ (U1.t()))
-                # * update R2
-                D2 = sum([(Xi.t()) @ self.R1 @ Bi for (Xi, Bi) in zip(X.detach(), B)])
+                # * update R2, D2 = sum_i Xi^T @ R1 @ Bi
+                D2 = torch.einsum('nab,nac->bc', Xd, self.R1 @ B)
                 U2, S2, V2 = torch.svd(D2)
                 self.R2 = (U2 @ (V2.t()))
         self.Rweight = ((self.R1.t()) @ X @ (self.R2)).view_as(w)
@@ -57,7 +56,18 @@ class BinarizeConv2d(nn.Conv2d):
         w3 = w2 + torch.abs(torch.sin(self.rotate)) * delta
 
         # * binarize
-        bw = BinaryQuantize().apply(w3, self.k.to(w.device), self.t.to(w.device))
+        return BinaryQuantize().apply(w3, self.k.to(w.device), self.t.to(w.device))
+
+    def forward(self, input):
+        a0 = input
+        w = self.weight
+        a1 = a0 - a0.mean([1, 2, 3], keepdim=True)
+        a2 = a1 / a1.std([1, 2, 3], keepdim=True)
+        if self.epoch > -1 and self.epoch % self.rotation_update == 0:
+            # the rotation is updated in binarize_weight
+            bw = self.binarize_weight()
+        else:
+            bw = frozen_weight(self, self.binarize_weight, self.weight, self.rotate, self.R1, self.R2)
         if self.a32 == 1:
             ba = a2
         else:
@@ -111,7 +121,7 @@ def get_ab(N):
 
 # last binary FC
 # simply
-class Binarize_last_fc(nn.Linear):
+class Binarize_last_fc(FrozenWeight, nn.Linear):
 
     def __init__(self, rotation_update, a32, *kargs, **kwargs):
         super(Binarize_last_fc, self).__init__(*kargs, **kwargs)
@@ -123,37 +133,35 @@ class Binarize_last_fc(nn.Linear):
 
         w = self.weight
         self.a, self.b = get_ab(np.prod(w.shape[1:]))
-        R1 = torch.tensor(ortho_group.rvs(dim=self.a)).float().cuda()
-        R2 = torch.tensor(ortho_group.rvs(dim=self.b)).float().cuda()
+        R1 = torch.tensor(ortho_group.rvs(dim=self.a)).float()
+        R2 = torch.tensor(ortho_group.rvs(dim=self.b)).float()
         self.register_buffer('R1', R1)
         self.register_buffer('R2', R2)
         self.Rweight = torch.ones_like(w)
 
         sw = w.abs().mean().float().detach()
-        self.alpha = nn.Parameter(sw.cuda(), requires_grad=True)
-        self.rotate = nn.Parameter(torch.ones(w.size(0), 1).cuda() * np.pi / 2, requires_grad=True)
+        self.alpha = nn.Parameter(sw, requires_grad=True)
+        self.rotate = nn.Parameter(torch.ones(w.size(0), 1) * np.pi / 2, requires_grad=True)
         self.Rotate = torch.zeros(1)
 
-    def forward(self, input):
-        a0 = input
+    def binarize_weight(self):
         w = self.weight
         w1 = w - w.mean([1], keepdim=True)
         w2 = w1 / w1.std([1], keepdim=True)
-        a1 = a0 - a0.mean([1], keepdim=True)
-        a2 = a1 / a1.std([1], keepdim=True)
         a, b = self.a, self.b
         X = w2.view(w.shape[0], a, b)
         if self.epoch > -1 and self.epoch % self.rotation_update == 0:
+            Xd = X.detach()  # [out_channels, a, b]
             for _ in range(3):
                 # * update B
-                V = self.R1.t() @ X.detach() @ self.R2
+                V = self.R1.t() @ Xd @ self.R2
                 B = torch.sign(V)
-                # * update R1
-                D1 = sum([Bi @ (self.R2.t()) @ (Xi.t()) for (Bi, Xi) in zip(B, X.detach())])
+                # * update R1, D1 = sum_i Bi @ R2^T @ Xi^T
+                D1 = torch.einsum('nab,ncb->ac', B @ self.R2.t(), Xd)
                 U1, S1, V1 = torch.svd(D1)
                 self.R1 = (V1 @ (U1.t()))
-                # * update R2
-                D2 = sum([(Xi.t()) @ self.R1 @ Bi for (Xi, Bi) in zip(X.detach(), B)])
+                # * update R2, D2 = sum_i Xi^T @ R1 @ Bi
+                D2 = torch.einsum('nab,nac->bc', Xd, self.R1 @ B)
                 U2, S2, V2 = torch.svd(D2)
                 self.R2 = (U2 @ (V2.t()))
         self.Rweight = ((self.R1.t()) @ X @ (self.R2)).view_as(w)
@@ -161,7 +169,18 @@ class Binarize_last_fc(nn.Linear):
         w3 = w2 + torch.abs(torch.sin(self.rotate)) * delta
 
         # * binarize
-        bw = BinaryQuantize().apply(w3, self.k.to(w.device), self.t.to(w.device))
+        return BinaryQuantize().apply(w3, self.k.to(w.device), self.t.to(w.device))
+
+    def forward(self, input):
+        a0 = input
+        w = self.weight
+        a1 = a0 - a0.mean([1], keepdim=True)
+        a2 = a1 / a1.std([1], keepdim=True)
+        if self.epoch > -1 and self.epoch % self.rotation_update == 0:
+            # the rotation is updated in binarize_weight
+            bw = self.binarize_weight()
+        else:
+            bw = frozen_weight(self, self.binarize_weight, self.weight, self.rotate, self.R1, self.R2)
         if self.a32 == 1:
             ba = a2
         else:
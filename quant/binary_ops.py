@@ -0,0 +1,52 @@
+import torch
+from utils.mann_binary import pack_bits
+
+
+def frozen_weight(module, binarize_weight, *tensors):
+    """
+    Cache the quantized weight of a module at inference (eval mode, no autograd), so that only the
+    activations are processed in the forward pass. The cache is rebuilt when any of the tensors it
+    depends on is replaced or modified in place by a tracked op (e.g. the optimizer or copy_), and is
+    cleared by train() / eval() and load_state_dict, see FrozenWeight. Writes through .data are not
+    tracked by autograd, so after e.g. module.weight.data.copy_(w) call module.clear_frozen().
+    """
+    if module.training or torch.is_grad_enabled():
+        module.frozen = None
+        return binarize_weight()
+
+    key = tuple((t.data_ptr(), t._version) for t in tensors)
+    if getattr(module, 'frozen', None) is None or module.frozen[0] != key:
+        module.frozen = (key, binarize_weight())
+    return module.frozen[1]
+
+
+class FrozenWeight(object):
+    """
+    Mixin of the quantized layers which cache their quantized weight with frozen_weight, placed before the
+    torch.nn base class, e.g. class last_fc(FrozenWeight, nn.Linear).
+    """
+
+    def clear_frozen(self):
+        """ Drop the cached quantized weight, it is rebuilt by the next inference forward pass. """
+        self.frozen = None
+
+    def train(self, mode=True):
+        self.clear_frozen()
+        return super(FrozenWeight, self).train(mode)
+
+    def _load_from_state_dict(self, *args, **kwargs):
+        self.clear_frozen()
+        return super(FrozenWeight, self)._load_from_state_dict(*args, **kwargs)
+
+
+def pack_conv_weight(bw):
+    """
+    Pack the binarized weights of a convolution along the input channels.
+
+    Input:
+    - bw: a tensor, which is of size [c_out, c_in, h, w], formed by {-1, 1}.
+
+    Output:
+    - a matrix, which is of size [c_out, h * w * ceil(c_in / 64)], dtype int64.
+    """
+    return pack_bits(bw.permute(0, 2, 3, 1)).flatten(1)
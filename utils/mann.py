@@ -1,72 +1,417 @@
-import torch.nn.functional as F
-import torch
-import os
-import shutil
-
-
-def save_checkpoint(state, is_best, save):
-    if not os.path.exists(save):
-        os.makedirs(save)
-    filename = os.path.join(save, 'checkpoint.path.tar')
-    torch.save(state, filename)
-    if is_best:
-        best_filename = os.path.join(save, 'model_best.pth.tar')
-        shutil.copyfile(filename, best_filename)
-
-
-class KeyValueMemory(object):
-    """
-    kv is a dictionary, for each item, the key is the support vector, and the
-    corresponding value is its one-hot label.
-    """
-
-    def __init__(self, x, x_labels):
-        super().__init__()
-        x_one_hot_labels = F.one_hot(x_labels)
-        self.kv = dict()
-        for i in range(len(x)):
-            self.kv[x[i, :]] = x_one_hot_labels[i, :]
-
-    def mem_size(self):
-        return len(self.kv)
-
-
-def softabs(alpha):
-    """ The sharpening function used in Nat Comm """
-    beta = 10
-    sa = 1 / torch.exp(-(beta * (alpha - 0.5) + 1)) + 1 / torch.exp(-(beta * (-alpha - 0.5) + 1))
-    return sa
-
-
-def sim_comp(kv, batch_features):
-    """
-    Input:
-    - kv: a dictionary, see KeyValueMemory.
-    - batch_features: a matrix, which is of size [batch * m, d].
-    """
-
-    ks = []
-    vs = []
-    for k, v in kv.items():
-        ks.append(k)
-        vs.append(v)
-    ks = torch.stack(ks).cuda()  # a matrix, which is of size [mn, d]
-    vs = torch.stack(vs).float().cuda()  # a matrix, which is of size [mn, m]
-
-    # Cosine Similarity
-    inner_product = torch.matmul(batch_features, ks.t())  # [batch * m, mn]
-    ks_norm = torch.norm(ks, dim=1).unsqueeze(0)  # ks: [mn, d], ks_norm: [1, mn]
-    feature_norm = torch.norm(batch_features, dim=1).unsqueeze(1)  # [batch * m, 1]
-    norm_product = ks_norm * feature_norm  # [batch * m, mn]
-    K = torch.squeeze(inner_product / (norm_product + 1e-8))
-
-    # Calculating softabs
-    K_exp = softabs(K)
-    w = K_exp / torch.sum(K_exp, 1, keepdim=True)  # [batch * m, mn]
-
-    # normalization
-    w = (w - w.mean([0, 1], keepdim=True)) / w.std([0, 1], keepdim=True)
-
-    ws = torch.matmul(w, vs)  # [batch * m, m]
-
-    return ws
+import torch.nn.functional as F
+import torch
+from torch.autograd import Function
+import os
+import math
+import shutil
+
+
+def save_checkpoint(state, is_best, save):
+    if not os.path.exists(save):
+        os.makedirs(save)
+    filename = os.path.join(save, 'checkpoint.path.tar')
+    torch.save(state, filename)
+    if is_best:
+        best_filename = os.path.join(save, 'model_best.pth.tar')
+        shutil.copyfile(filename, best_filename)
+
+
+def mean_confidence_interval(accuracies):
+    """ The mean and the half width of the 95% confidence interval of the accuracies of the episodes. """
+    accuracies = torch.as_tensor(accuracies, dtype=torch.float)
+    mean = accuracies.mean().item()
+    if len(accuracies) < 2:
+        return mean, 0.0
+    return mean, 1.96 * accuracies.std().item() / math.sqrt(len(accuracies))
+
+
+def inference_mode():
+    """ torch.inference_mode (torch >= 1.9) or torch.no_grad, used in validation and inference. """
+    if hasattr(torch, 'inference_mode'):
+        return torch.inference_mode()
+    return torch.no_grad()
+
+
+def bundle_prototypes(x, x_labels, num_classes, binary_id=None):
+    """
+    Bundle the shots of each class into a single prototype key.
+
+    Input:
+    - x: a matrix, which is of size [mn, d] (or [E, mn, d]), the support vectors.
+    - x_labels: a vector, which is of size [mn] (or [E, mn]), in [0, num_classes).
+    - num_classes: an int, m.
+    - binary_id: None for real-valued support vectors, bundled by their sum (the cosine and dot similarities
+      to the sum are those to the mean, up to a per-class scale). Otherwise the vectors are formed by {-1, 1}
+      (binary_id=1) or {0, 1} (binary_id=2), and bundled by the majority of each bit, a tie gives -1 / 0.
+
+    Output:
+    - a matrix, which is of size [m, d] (or [E, m, d]), the prototypes.
+    - a vector, which is of size [m] (or [E, m]), their labels, i.e., 0, ..., m - 1.
+    """
+    x_labels = x_labels.to(x.device)
+    sums = x.new_zeros(x.shape[:-2] + (num_classes, x.size(-1)))
+    sums.scatter_add_(-2, x_labels.unsqueeze(-1).expand_as(x), x)
+
+    if binary_id == 1:
+        prototypes = torch.where(sums > 0, torch.ones_like(sums), -torch.ones_like(sums))
+    elif binary_id == 2:
+        counts = x.new_zeros(sums.shape[:-1]).scatter_add_(-1, x_labels, torch.ones_like(x_labels, dtype=x.dtype))
+        prototypes = (2 * sums > counts.unsqueeze(-1)).to(x.dtype)
+    else:
+        prototypes = sums
+    labels = torch.arange(num_classes, device=x.device).expand(sums.shape[:-1])
+
+    return prototypes, labels
+
+
+class KeyValueMemory(object):
+    """
+    The key memory is a contiguous matrix of size [capacity, d], and each of its first `size` rows is a
+    support vector. The value memory is a vector of size [capacity], which records the label of the
+    corresponding key. Both are preallocated, so the similarity calls can directly use `ks` and `vs`
+    without stacking the support vectors again.
+
+    The L2 norms of the keys (a vector of size [capacity]) are also computed when the keys are written,
+    so the cosine similarity only normalizes the queries and scales the [batch * m, mn] dot products by
+    `inv_norms`. Being written with the keys, they are in the same autograd / inference mode as the keys,
+    i.e., a memory written in training can be read in inference_mode and vice versa.
+
+    Classes can be enrolled over time (add_class, enroll, with label-space growth), their stale shots
+    overwritten (prune) and deleted (delete, delete_class), without rebuilding the memory.
+    """
+    keep_norms = True  # keep the norms of the keys
+
+    def __init__(self, x=None, x_labels=None, capacity=None, feature_dim=None, device=None, dtype=torch.float):
+        """
+        x: a matrix, which is of size [mn, d], the support vectors.
+        x_labels: a vector, which is of size [mn], the labels of the support vectors.
+        capacity: an int, number of keys to preallocate, default is len(x).
+        feature_dim: an int, the dimension of the keys, only used when x is None.
+        device: the device of the memory, default is the device of x.
+        dtype: the data type of the keys.
+        """
+        super().__init__()
+        if x is not None:
+            feature_dim = x.size(1)
+            device = x.device if device is None else device
+            capacity = len(x) if capacity is None else max(capacity, len(x))
+
+        self.feature_dim = feature_dim
+        self.device = torch.device('cpu') if device is None else torch.device(device)
+        self.capacity = 0 if capacity is None else capacity
+        self.keys = torch.zeros(self.capacity, feature_dim, dtype=dtype, device=self.device)
+        self.norms = torch.zeros(self.capacity, device=self.device) if self.keep_norms else None
+        self.labels = torch.zeros(self.capacity, dtype=torch.long, device=self.device)
+        self.stamps = torch.zeros(self.capacity, dtype=torch.long, device=self.device)  # write order of the items
+        self.clock = 0
+        self.size = 0
+        self.num_classes = 0
+
+        if x is not None:
+            self.append(x, x_labels)
+
+    def _grow(self, capacity):
+        """ Reallocate the key / value memory, the existing items are kept. """
+        capacity = max(capacity, 2 * self.capacity)
+        keys = torch.zeros(capacity, self.feature_dim, dtype=self.keys.dtype, device=self.device)
+        labels = torch.zeros(capacity, dtype=torch.long, device=self.device)
+        stamps = torch.zeros(capacity, dtype=torch.long, device=self.device)
+        keys[:self.size] = self.keys[:self.size]
+        labels[:self.size] = self.labels[:self.size]
+        stamps[:self.size] = self.stamps[:self.size]
+        self.stamps = stamps
+        if self.keep_norms:
+            norms = torch.zeros(capacity, device=self.device)
+            norms[:self.size] = self.norms[:self.size]
+            self.norms = norms
+        self.keys, self.labels, self.capacity = keys, labels, capacity
+
+    def append(self, x, x_labels):
+        """ Write the support vectors x [k, d] with labels x_labels [k] after the existing items. """
+        if len(x) == 0:
+            return
+        end = self.size + len(x)
+        if end > self.capacity:
+            self._grow(end)
+        self.keys[self.size:end] = x.to(self.device)
+        if self.keep_norms:
+            self.norms[self.size:end] = self.keys[self.size:end].norm(dim=-1)
+        self.labels[self.size:end] = x_labels.to(self.device)
+        self.stamps[self.size:end] = self.tick(len(x))
+        self.size = end
+        self.num_classes = max(self.num_classes, int(x_labels.max()) + 1)
+
+    def overwrite(self, idx, x, x_labels):
+        """ Replace the items at the positions idx (a LongTensor of size [k]) with x [k, d] and x_labels [k]. """
+        if len(idx) == 0:
+            return
+        idx = idx.to(self.device)
+        self.keys[idx] = x.to(self.device)
+        if self.keep_norms:
+            self.norms[idx] = self.keys[idx].norm(dim=-1)
+        self.labels[idx] = x_labels.to(self.device)
+        self.stamps[idx] = self.tick(len(idx))
+        self.num_classes = max(self.num_classes, int(x_labels.max()) + 1)
+
+    def tick(self, k):
+        """ The stamps of k items written now. """
+        self.clock += k
+        return torch.arange(self.clock - k, self.clock, device=self.device)
+
+    def add_class(self, x):
+        """ Enroll a new class with the shots x [k, d], its label (num_classes) is returned. """
+        label = self.num_classes
+        self.append(x, torch.full((len(x),), label, dtype=torch.long))
+        return label
+
+    def enroll(self, x, x_labels, max_shots=None):
+        """
+        Write the shots x [k, d] of the (new or existing) classes x_labels [k], the label space grows to
+        max(x_labels) + 1 if needed. With max_shots, only the max_shots most recent shots of each class are
+        kept, the stale ones are deleted.
+        """
+        self.append(x, x_labels)
+        if max_shots is not None:
+            self.prune(max_shots)
+
+    def prune(self, max_shots):
+        """ Delete the stale shots of each class, i.e., all but its max_shots most recent ones. """
+        labels, stamps = self.vs, self.stamps[:self.size]
+
+        # the items sorted by class, the most recent first within a class
+        order = torch.argsort(labels * (self.clock + 1) + (self.clock - stamps))
+        counts = torch.bincount(labels, minlength=self.num_classes)
+        rank = torch.arange(self.size, device=self.device) - (torch.cumsum(counts, 0) - counts)[labels[order]]
+        self.delete(order[rank >= max_shots])
+
+    def delete(self, idx):
+        """
+        Delete the items at the positions idx (a LongTensor of size [k]). The last items are moved into the
+        holes, so the memory stays contiguous but the positions of the moved items change.
+        """
+        keep = torch.ones(self.size, dtype=torch.bool, device=self.device)
+        keep[idx.to(self.device)] = False
+        size = int(keep.sum())
+        holes = (~keep[:size]).nonzero().squeeze(1)
+        moved = keep[size:].nonzero().squeeze(1) + size
+
+        self.keys[holes] = self.keys[moved]
+        if self.keep_norms:
+            self.norms[holes] = self.norms[moved]
+        self.labels[holes] = self.labels[moved]
+        self.stamps[holes] = self.stamps[moved]
+        self.size = size
+
+    def delete_class(self, label):
+        """ Delete all the shots of the class label, its label is not reused (see read_values). """
+        self.delete((self.vs == label).nonzero().squeeze(1))
+
+    def clear(self):
+        """ Empty the memory, the preallocated storage is reused by the next append. """
+        self.keys = self.keys.detach()
+        if self.keep_norms:
+            self.norms = self.norms.detach()
+        self.size = 0
+        self.num_classes = 0
+
+    @property
+    def ks(self):
+        """ The key matrix, which is of size [mn, d]. """
+        return self.keys[:self.size]
+
+    @property
+    def inv_norms(self):
+        """ The inverse L2 norms of the keys, 1 / max(norm, eps) as in F.normalize, a vector of size [mn]. """
+        return 1 / self.norms[:self.size].clamp(min=1e-12)
+
+    @property
+    def vs(self):
+        """ The value vector, i.e., the labels of the keys, which is of size [mn]. """
+        return self.labels[:self.size]
+
+    def bundle(self, binary_id=None):
+        """ A KeyValueMemory of the class prototypes, one key per class, see bundle_prototypes. """
+        prototypes, labels = bundle_prototypes(self.ks, self.vs, self.num_classes, binary_id)
+        found = torch.bincount(self.vs, minlength=self.num_classes) > 0  # e.g. deleted classes
+        kv = KeyValueMemory(prototypes[found], labels[found])
+        kv.num_classes = self.num_classes
+        return kv
+
+    def mem_size(self):
+        return self.size
+
+
+class BatchKeyValueMemory(object):
+    """
+    The key-value memories of E independent episodes, i.e., a key tensor of size [E, mn, d] and a label
+    matrix of size [E, mn], so that the similarity of all the episodes is computed with batched matmuls.
+    A memory lives for one batch of episodes, so the norms of the keys are only computed when they are
+    read (inv_norms), i.e., by the cosine similarities.
+    """
+
+    def __init__(self, x, x_labels):
+        """
+        x: a tensor, which is of size [E, mn, d], the support vectors of each episode.
+        x_labels: a matrix, which is of size [E, mn], the labels of the support vectors.
+        """
+        super().__init__()
+        self.keys = x
+        self.labels = x_labels.to(x.device)
+        self.num_classes = int(x_labels.max()) + 1
+
+    @property
+    def ks(self):
+        """ The key tensor, which is of size [E, mn, d]. """
+        return self.keys
+
+    @property
+    def inv_norms(self):
+        """ The inverse L2 norms of the keys, a matrix of size [E, mn], see KeyValueMemory.inv_norms. """
+        return 1 / self.keys.norm(dim=-1).clamp(min=1e-12)
+
+    @property
+    def vs(self):
+        """ The value matrix, i.e., the labels of the keys, which is of size [E, mn]. """
+        return self.labels
+
+    def episode(self, i):
+        """ The KeyValueMemory of the i-th episode. """
+        return KeyValueMemory(self.keys[i], self.labels[i])
+
+    def bundle(self, binary_id=None):
+        """ A BatchKeyValueMemory of the class prototypes of each episode, see bundle_prototypes. """
+        return BatchKeyValueMemory(*bundle_prototypes(self.keys, self.labels, self.num_classes, binary_id))
+
+    def mem_size(self):
+        return self.keys.size(0) * self.keys.size(1)
+
+
+def read_values(kv, w):
+    """
+    Read the value memory with the weights w of the keys: the weights are summed per class with a
+    scatter_add over the labels, i.e., matmul(w, one_hot(labels)) without the one-hot matrix.
+
+    Input:
+    - kv: the key-value memory, see KeyValueMemory / BatchKeyValueMemory.
+    - w: a matrix, which is of size [batch * m, mn] (or [E, batch * m, mn]).
+
+    Output:
+    - a matrix, which is of size [batch * m, m] (or [E, batch * m, m]). The classes without keys (e.g.
+      deleted ones) have the score -inf, so they are never predicted.
+    """
+    index = kv.vs.unsqueeze(-2).expand_as(w)
+    ws = w.new_zeros(w.shape[:-1] + (kv.num_classes,)).scatter_add(-1, index, w)
+
+    counts = torch.zeros(kv.vs.shape[:-1] + (kv.num_classes,), dtype=torch.long, device=w.device)
+    counts.scatter_add_(-1, kv.vs, torch.ones_like(kv.vs))
+
+    return ws.masked_fill((counts == 0).unsqueeze(-2), -math.inf)
+
+
+def softabs(alpha):
+    """ The sharpening function used in Nat Comm """
+    beta = 10
+    sa = 1 / torch.exp(-(beta * (alpha - 0.5) + 1)) + 1 / torch.exp(-(beta * (-alpha - 0.5) + 1))
+    return sa
+
+
+class CosineSoftabs(Function):
+    """
+    The weights of the keys in sim_comp, fused: cosine similarity K of the normalized queries and keys
+    (the dot products scaled by the inverse norms of the keys), softabs, normalization over the keys, then standardization over all the weights. As
+    softabs(K) = 2 * exp(1 - beta / 2) * cosh(beta * K), the normalized softabs is cosh(beta * K) / sum,
+    so a single [batch * m, mn] buffer is updated in place. Only the standardized weights and the
+    statistics are saved, the backward pass recomputes K with one matmul.
+    """
+    beta = 10
+
+    @staticmethod
+    def forward(ctx, qs, ks, inv_norms):
+        """
+        - qs: a matrix, which is of size [batch * m, d] (or [E, batch * m, d]), the normalized queries.
+        - ks: a matrix, which is of size [mn, d] (or [E, mn, d]), the keys.
+        - inv_norms: a vector, which is of size [mn] (or [E, mn]), the inverse norms of the keys.
+        """
+        w = torch.matmul(qs, ks.transpose(-2, -1))  # [batch * m, mn]
+        w.mul_(inv_norms.unsqueeze(-2))  # cosine similarity
+        w.mul_(CosineSoftabs.beta).cosh_()
+        rowsum = w.sum(-1, keepdim=True)
+        w.div_(rowsum)
+        mean = w.mean([-2, -1], keepdim=True)
+        std = w.std([-2, -1], keepdim=True)
+        w.sub_(mean).div_(std)
+
+        ctx.save_for_backward(qs, ks, inv_norms, w, mean, std, rowsum)
+        return w
+
+    @staticmethod
+    def backward(ctx, grad_output):
+        qs, ks, inv_norms, w, mean, std, rowsum = ctx.saved_tensors
+        n = w.size(-2) * w.size(-1)
+
+        # through the standardization (unbiased std)
+        grad_p = grad_output - grad_output.mean([-2, -1], keepdim=True)
+        grad_p.sub_(w * ((grad_output * w).sum([-2, -1], keepdim=True) / (n - 1))).div_(std)
+
+        # through the normalization, p = cosh / rowsum
+        p = w * std + mean
+        grad_p.sub_((grad_p * p).sum(-1, keepdim=True)).div_(rowsum)
+
+        # through cosh(beta * K), K = S * inv_norms
+        S = torch.matmul(qs, ks.transpose(-2, -1))
+        K = S * inv_norms.unsqueeze(-2)
+        grad_K = grad_p.mul_(K.mul_(CosineSoftabs.beta).sinh_()).mul_(CosineSoftabs.beta)
+        grad_inv_norms = (grad_K * S).sum(-2) if ctx.needs_input_grad[2] else None
+        grad_S = grad_K.mul_(inv_norms.unsqueeze(-2))
+
+        grad_qs = torch.matmul(grad_S, ks) if ctx.needs_input_grad[0] else None
+        grad_ks = torch.matmul(grad_S.transpose(-2, -1), qs) if ctx.needs_input_grad[1] else None
+        return grad_qs, grad_ks, grad_inv_norms
+
+
+def sim_comp(kv, batch_features):
+    """
+    Input:
+    - kv: the key-value memory, see KeyValueMemory / BatchKeyValueMemory.
+    - batch_features: a matrix, which is of size [batch * m, d].
+      With a BatchKeyValueMemory, the sizes have a leading episode dim, e.g. [E, batch * m, d].
+    """
+
+    # Cosine Similarity + softabs + normalization, see CosineSoftabs
+    qs = F.normalize(batch_features, dim=-1)  # [batch * m, d]
+    w = CosineSoftabs.apply(qs, kv.ks, kv.inv_norms)  # [batch * m, mn], the norms are kept with the keys
+
+    ws = read_values(kv, w)  # [batch * m, m]
+
+    return ws
+
+
+def stream_queries(kv, queries, sim=sim_comp, chunk_size=1024, **kwargs):
+    """
+    Answer a stream of queries against a fixed memory, chunk by chunk, so the peak memory is bounded by
+    the [chunk_size, mn] similarity matrix instead of [q, mn].
+
+    The row-wise similarities (sim_comp_approx, sim_comp_binary, sim_comp_topk) give the same scores as
+    on the whole query batch. sim_comp and sim_comp_softmax standardize the weights over the queries of
+    a call, so their scores depend on the chunks; with the same number of shots per class, the predictions
+    do not.
+
+    Input:
+    - kv: the key-value memory, e.g. a KeyValueMemory or a BinaryKeyValueMemory.
+    - queries: a matrix, which is of size [q, d], or an iterable (e.g. a generator) of matrices [k, d].
+    - sim: the similarity function, called as sim(kv, chunk, **kwargs).
+    - chunk_size: an int, the maximum number of queries processed at once.
+
+    Output (a generator), for each chunk:
+    - a vector, which is of size [k], the predicted labels.
+    - a matrix, which is of size [k, m], the scores of the classes.
+    """
+    if torch.is_tensor(queries):
+        queries = [queries]
+
+    for chunk in queries:
+        for q in chunk.split(chunk_size):
+            # not around the yield, which would also hold for the code of the caller
+            with inference_mode():
+                ws = sim(kv, q.to(kv.ks.device), **kwargs)
+            yield ws.argmax(-1), ws
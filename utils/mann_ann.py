@@ -0,0 +1,158 @@
+import math
+import torch
+import torch.nn.functional as F
+from utils.mann_binary import BinaryKeyValueMemory, unpack_bits
+
+
+def topk_candidates(query_ids, key_ids, scores, num_queries, k):
+    """
+    Select the k best candidate keys of every query.
+
+    Input:
+    - query_ids, key_ids, scores: vectors, the (query, key) candidate pairs sorted by query_ids, and their scores.
+    - num_queries: an int, the number of queries.
+    - k: an int.
+
+    Output:
+    - scores: a matrix, which is of size [num_queries, min(k, max #candidates)], sorted in descending order.
+    - keys: a matrix of the same size, the positions of the keys in the memory. A query with less candidates
+      than the width is padded with the key -1 and the score -inf.
+    """
+    device = scores.device
+    counts = torch.bincount(query_ids, minlength=num_queries)
+    width = max(int(counts.max()), 1) if len(query_ids) > 0 else 1
+    rank = torch.arange(len(query_ids), device=device) - (torch.cumsum(counts, 0) - counts)[query_ids]
+
+    dense_scores = torch.full((num_queries, width), -math.inf, device=device)
+    dense_keys = torch.full((num_queries, width), -1, dtype=torch.long, device=device)
+    dense_scores[query_ids, rank] = scores.float()
+    dense_keys[query_ids, rank] = key_ids
+
+    top_scores, top = dense_scores.topk(min(k, width), dim=1)
+
+    return top_scores, dense_keys.gather(1, top)
+
+
+class IVFIndex(object):
+    """
+    Top-k search over the keys of a KeyValueMemory with an inverted file: the normalized keys are clustered
+    into nlist lists by spherical k-means, and a query is only compared (cosine similarity) to the keys of
+    its nprobe closest lists. More probed lists give a higher recall and a higher latency. The index is a
+    snapshot of the memory, build it again after writing the memory.
+
+    The index keeps one copy of the keys grouped by list: the normalized keys of a KeyValueMemory, or the
+    packed keys of a BinaryKeyValueMemory, which are unpacked chunk_size (or one list) at a time. The
+    cosine similarity of {-1, 1} keys to {-1, 1} queries is the bipolar similarity of sim_comp_approx
+    (binary_id=1), so only bipolar binary memories are supported.
+    """
+
+    def __init__(self, kv, nlist=None, nprobe=8, num_iters=10, binary_id=1, chunk_size=4096):
+        """
+        kv: a KeyValueMemory or a BinaryKeyValueMemory, which is not empty.
+        nlist: an int, number of lists, default is sqrt(#keys).
+        nprobe: an int, number of lists probed by each query.
+        num_iters: an int, number of k-means iterations.
+        binary_id: an int, the encoding of the keys of a BinaryKeyValueMemory, only 1 ({-1, 1}) is supported.
+        chunk_size: an int, number of keys normalized (or unpacked) at once when building the index.
+        """
+        self.kv = kv
+        self.binary = isinstance(kv, BinaryKeyValueMemory)
+        if self.binary and binary_id != 1:
+            raise ValueError('IVFIndex only supports bipolar (binary_id=1) binary keys, got {}.'.format(binary_id))
+        n = kv.size
+        if n == 0:
+            raise ValueError('IVFIndex cannot index an empty memory.')
+        ks = kv.ks
+        self.nlist = min(n, int(math.sqrt(n)) if nlist is None else nlist)
+        self.nprobe = min(nprobe, self.nlist)
+
+        # spherical k-means, an empty list keeps its centroid
+        self.centroids = self.unit_keys(ks[torch.randperm(n)[:self.nlist].to(ks.device)])
+        for _ in range(num_iters):
+            sums = torch.zeros_like(self.centroids)
+            counts = torch.zeros(self.nlist, dtype=torch.long, device=sums.device)
+            for chunk in ks.split(chunk_size):
+                x = self.unit_keys(chunk)
+                assign = torch.matmul(x, self.centroids.t()).argmax(1)
+                sums.index_add_(0, assign, x)
+                counts += torch.bincount(assign, minlength=self.nlist)
+            empty = (counts == 0).unsqueeze(1)
+            self.centroids = torch.where(empty, self.centroids, F.normalize(sums, dim=-1))
+
+        # the keys grouped by list, list l is order[offsets[l]:offsets[l + 1]]
+        assign = torch.cat([torch.matmul(self.unit_keys(chunk), self.centroids.t()).argmax(1)
+                            for chunk in ks.split(chunk_size)])
+        _, self.order = torch.sort(assign)
+        counts = torch.bincount(assign, minlength=self.nlist)
+        self.offsets = [0] + torch.cumsum(counts, 0).tolist()
+        if self.binary:
+            self.list_keys = ks[self.order]  # packed
+        else:
+            self.list_keys = torch.cat([self.unit_keys(ks[idx]) for idx in self.order.split(chunk_size)])
+
+    def unit_keys(self, keys):
+        """ The normalized float keys of rows of the memory, the packed keys are unpacked. """
+        if self.binary:
+            return unpack_bits(keys, self.kv.dim) / math.sqrt(self.kv.dim)
+        return F.normalize(keys.float(), dim=-1)
+
+    def search(self, batch_features, k):
+        """
+        Input:
+        - batch_features: a matrix, which is of size [batch * m, d].
+        - k: an int, number of keys returned for each query.
+
+        Output: the cosine similarities and the positions of the top-k keys, see topk_candidates.
+        """
+        qs = F.normalize(batch_features.float(), dim=-1)
+        probes = torch.matmul(qs, self.centroids.t()).topk(self.nprobe, dim=1)[1]  # [Q, nprobe]
+
+        # the queries grouped by probed list
+        probe_queries = torch.arange(len(qs), device=qs.device).repeat_interleave(self.nprobe)
+        _, probe_order = torch.sort(probes.flatten())
+        groups = probe_order.split(torch.bincount(probes.flatten(), minlength=self.nlist).tolist())
+
+        # one matmul per list, only its top-k keys are kept for each query
+        query_ids, key_ids, scores = [qs.new_zeros(0, dtype=torch.long)], [self.order[:0]], [qs.new_zeros(0)]
+        for l, group in enumerate(groups):
+            lo, hi = self.offsets[l], self.offsets[l + 1]
+            if len(group) == 0 or lo == hi:
+                continue
+            group_queries = probe_queries[group]
+            keys = self.unit_keys(self.list_keys[lo:hi]) if self.binary else self.list_keys[lo:hi]
+            s = torch.matmul(qs[group_queries], keys.t())  # [#queries, #keys]
+            s, top = s.topk(min(k, hi - lo), dim=1)
+            query_ids.append(group_queries.unsqueeze(1).expand_as(top).flatten())
+            key_ids.append(self.order[lo:hi][top].flatten())
+            scores.append(s.flatten())
+
+        # the lists are disjoint, so the candidates are unique
+        query_ids, by_query = torch.sort(torch.cat(query_ids))
+
+        return topk_candidates(query_ids, torch.cat(key_ids)[by_query], torch.cat(scores)[by_query], len(qs), k)
+
+
+def sim_comp_topk(kv, index, batch_features, k=10):
+    """
+    The similarity of the queries to the classes, only summed over their top-k keys retrieved by index,
+    instead of over all the keys as sim_comp_approx.
+
+    Input:
+    - kv: the KeyValueMemory (or BinaryKeyValueMemory) indexed by index.
+    - index: an IVFIndex.
+    - batch_features: a matrix, which is of size [batch * m, d].
+    - k: an int, number of keys retrieved for each query.
+
+    Output:
+    - a matrix, which is of size [batch * m, m]. The classes without retrieved keys have the score -inf,
+      as in read_values.
+    """
+    scores, key_ids = index.search(batch_features, k)
+    found = key_ids >= 0
+    labels = kv.labels[key_ids.clamp(min=0)]
+    scores = torch.where(found, scores, torch.zeros_like(scores))
+
+    ws = torch.zeros(len(scores), kv.num_classes, device=scores.device).scatter_add_(1, labels, scores)
+    hits = torch.zeros_like(ws).scatter_add_(1, labels, found.float())
+
+    return ws.masked_fill(hits == 0, -math.inf)
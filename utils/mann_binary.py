@@ -0,0 +1,144 @@
+import torch
+from utils.mann import KeyValueMemory, BatchKeyValueMemory, bundle_prototypes, read_values
+
+
+def num_words(dim):
+    """ Number of 64-bit words to store a binary vector of dimension dim. """
+    return (dim + 63) // 64
+
+
+def pack_bits(x):
+    """
+    Pack binary feature vectors into 64-bit words, the element x[..., j] > 0 is stored as the bit
+    (j % 64) of the word j // 64, the padding bits are 0.
+
+    Input:
+    - x: a matrix, which is of size [n, d] (or [E, n, d]), formed by {-1, 1} or {0, 1}.
+
+    Output:
+    - a matrix, which is of size [n, ceil(d / 64)] (or [E, n, ceil(d / 64)]), dtype int64.
+    """
+    size = x.size()[:-1]
+    d = x.size(-1)
+    words = num_words(d)
+    bits = torch.zeros(*size, words * 64, dtype=torch.long, device=x.device)
+    bits[..., :d] = (x > 0).long()
+    shifts = torch.arange(64, dtype=torch.long, device=x.device)
+
+    # the bits do not overlap, so the (wrapping) sum is a bitwise or
+    return (bits.view(*size, words, 64) << shifts).sum(-1)
+
+
+def unpack_bits(x, dim):
+    """
+    The inverse of pack_bits for bipolar vectors.
+
+    Input:
+    - x: a matrix, which is of size [n, ceil(d / 64)] (or [E, n, ceil(d / 64)]), dtype int64.
+    - dim: an int, the dimension d of the unpacked vectors.
+
+    Output:
+    - a matrix, which is of size [n, d] (or [E, n, d]), formed by {-1, 1}.
+    """
+    shifts = torch.arange(64, dtype=torch.long, device=x.device)
+    bits = (x.unsqueeze(-1) >> shifts) & 1  # [n, words, 64]
+    bits = bits.flatten(-2)[..., :dim]
+
+    return bits.float() * 2 - 1
+
+
+class BinaryKeyValueMemory(KeyValueMemory):
+    """
+    Key-value memory for binarized support vectors. Each key is packed into ceil(d / 64) int64 words,
+    i.e., 8 bytes per 64 dimensions instead of 256 bytes with float32.
+    """
+    keep_norms = False
+
+    def __init__(self, x=None, x_labels=None, capacity=None, feature_dim=None, device=None):
+        """
+        x: a matrix, which is of size [mn, d], formed by {-1, 1} or {0, 1}.
+        x_labels: a vector, which is of size [mn].
+        feature_dim: an int, the dimension d of the (unpacked) keys, only used when x is None.
+        """
+        if x is not None:
+            feature_dim = x.size(1)
+            device = x.device if device is None else device
+            capacity = len(x) if capacity is None else max(capacity, len(x))
+        self.dim = feature_dim
+        super().__init__(capacity=capacity, feature_dim=num_words(feature_dim), device=device, dtype=torch.long)
+
+        if x is not None:
+            self.append(x, x_labels)
+
+    def append(self, x, x_labels):
+        super().append(pack_bits(x), x_labels)
+
+    def overwrite(self, idx, x, x_labels):
+        super().overwrite(idx, pack_bits(x), x_labels)
+
+    def bundle(self):
+        """ A BinaryKeyValueMemory of the class prototypes, the majority of the bits of the shots of each class. """
+        prototypes, labels = bundle_prototypes(unpack_bits(self.ks, self.dim), self.vs, self.num_classes, binary_id=1)
+        found = torch.bincount(self.vs, minlength=self.num_classes) > 0  # e.g. deleted classes
+        kv = BinaryKeyValueMemory(prototypes[found], labels[found])
+        kv.num_classes = self.num_classes
+        return kv
+
+
+class BatchBinaryKeyValueMemory(BatchKeyValueMemory):
+    """ The bit-packed version of BatchKeyValueMemory, the keys are of size [E, mn, ceil(d / 64)]. """
+    keep_norms = False
+
+    def __init__(self, x, x_labels):
+        """
+        x: a tensor, which is of size [E, mn, d], formed by {-1, 1} or {0, 1}.
+        x_labels: a matrix, which is of size [E, mn].
+        """
+        self.dim = x.size(-1)
+        super().__init__(pack_bits(x), x_labels)
+
+    def episode(self, i):
+        """ The BinaryKeyValueMemory of the i-th episode. """
+        kv = BinaryKeyValueMemory(capacity=self.keys.size(1), feature_dim=self.dim, device=self.keys.device)
+        KeyValueMemory.append(kv, self.keys[i], self.labels[i])  # the keys are packed already
+        return kv
+
+    def bundle(self):
+        """ A BatchBinaryKeyValueMemory of the class prototypes of each episode, see BinaryKeyValueMemory.bundle. """
+        x = unpack_bits(self.keys, self.dim)
+        return BatchBinaryKeyValueMemory(*bundle_prototypes(x, self.labels, self.num_classes, binary_id=1))
+
+
+def sim_comp_binary(kv, batch_features, binary_id=1, chunk_size=1024):
+    """
+    The same scores as sim_comp_approx over the packed keys. The keys are unpacked chunk_size at a time
+    and scored with a matmul, so the scoring needs a [chunk_size, d] float buffer on top of the scores,
+    whatever the size of the memory. The packing saves the memory of the stored keys, the scoring is not
+    faster than sim_comp_approx over float keys.
+
+    Input:
+    - kv: a BinaryKeyValueMemory or a BatchBinaryKeyValueMemory.
+    - batch_features: a matrix, which is of size [batch * m, d], formed by {-1, 1} (binary_id=1)
+      or {0, 1} (binary_id=2). With a BatchBinaryKeyValueMemory, it is of size [E, batch * m, d].
+    - binary_id: an int, see sim_comp_approx.
+    - chunk_size: an int, number of keys unpacked at once.
+    """
+    d = kv.dim
+    qs = batch_features.float()
+
+    w = []
+    for ks in kv.ks.split(chunk_size, dim=-2):
+        ks = unpack_bits(ks, d)  # [chunk, d], {-1, 1}
+
+        # Case 1: bipolar
+        if binary_id == 1:
+            w.append(1 / d * torch.matmul(qs, ks.transpose(-2, -1)))  # [batch * m, chunk]
+
+        # Case 2: binary, the keys are {0, 1}
+        elif binary_id == 2:
+            w.append(1 / 2 + 1 / (2 * d) * torch.matmul(qs, ((ks + 1) / 2).transpose(-2, -1)))
+    w = torch.cat(w, dim=-1)  # [batch * m, mn]
+
+    ws = read_values(kv, w)  # [batch * m, m]
+
+    return ws
@@ -0,0 +1,86 @@
+import os
+import json
+import numpy as np
+import torch
+from utils.mann import KeyValueMemory
+from utils.mann_binary import BinaryKeyValueMemory
+
+# version of the on-disk format, see save_memory
+FORMAT_VERSION = 2
+
+
+def save_memory(kv, path, binary_id=None, half=True):
+    """
+    Save a populated memory, so an inference worker can load it (see load_memory) instead of running the
+    Controller over the support set again. The memory is stored in the directory path as
+    - keys.npy: the packed keys [mn, ceil(d / 64)] (int64) of a BinaryKeyValueMemory, otherwise the keys [mn, d]
+      in float16 (half=True) or float32.
+    - norms.npy: the norms of the real-valued keys [mn], float32, see KeyValueMemory.
+    - labels.npy, stamps.npy: the labels and the write stamps (see KeyValueMemory.prune) [mn], int64.
+    - meta.json: the type of the memory, feature_dim, num_classes, clock and binary_id.
+
+    Input:
+    - kv: a KeyValueMemory or a BinaryKeyValueMemory.
+    - path: a str, the directory, created if needed.
+    - binary_id: None, 1 or 2, the encoding of the keys ({-1, 1} or {0, 1}), only recorded in meta.json.
+    - half: a bool, store the real-valued keys in float16, which halves the file but the keys are then
+      converted to float32 on load, see load_memory.
+    """
+    if not os.path.exists(path):
+        os.makedirs(path)
+    binary = isinstance(kv, BinaryKeyValueMemory)
+    keys = kv.ks.detach().cpu()
+    if not binary:
+        keys = keys.half() if half else keys.float()
+
+    np.save(os.path.join(path, 'keys.npy'), keys.numpy())
+    if not binary:
+        np.save(os.path.join(path, 'norms.npy'), kv.norms[:kv.size].detach().float().cpu().numpy())
+    np.save(os.path.join(path, 'labels.npy'), kv.vs.cpu().numpy())
+    np.save(os.path.join(path, 'stamps.npy'), kv.stamps[:kv.size].cpu().numpy())
+    meta = {'version': FORMAT_VERSION, 'binary': binary, 'feature_dim': kv.dim if binary else kv.feature_dim,
+            'num_classes': kv.num_classes, 'clock': kv.clock, 'binary_id': binary_id, 'size': kv.size}
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+
+def load_memory(path, device=None, mmap=True):
+    """
+    Load a memory saved by save_memory.
+
+    With mmap=True the arrays are memory-mapped copy-on-write: a BinaryKeyValueMemory, or a KeyValueMemory
+    saved with half=False, on CPU is used in place (the keys and their saved norms), the pages are read when
+    first scored and shared by the workers on the same host, they are only copied when written. float16 keys
+    (half=True) are converted to float32, which reads the whole file into a private copy.
+
+    Input:
+    - path: a str, the directory written by save_memory.
+    - device: the device of the memory, default is CPU.
+    - mmap: a bool.
+
+    Output:
+    - a KeyValueMemory or a BinaryKeyValueMemory.
+    - a dict, the metadata, e.g. meta['binary_id'].
+    """
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    if meta['version'] != FORMAT_VERSION:
+        raise ValueError('unsupported memory format version {}'.format(meta['version']))
+
+    def load(name):
+        return torch.from_numpy(np.load(os.path.join(path, name), mmap_mode='c' if mmap else None))
+
+    if meta['binary']:
+        kv = BinaryKeyValueMemory(feature_dim=meta['feature_dim'], device=device)
+        kv.keys = load('keys.npy').to(kv.device)
+    else:
+        kv = KeyValueMemory(feature_dim=meta['feature_dim'], device=device)
+        kv.keys = load('keys.npy').to(kv.device, torch.float)
+        kv.norms = load('norms.npy').to(kv.device)
+    kv.labels = load('labels.npy').to(kv.device)
+    kv.stamps = load('stamps.npy').to(kv.device)
+    kv.size = kv.capacity = meta['size']
+    kv.num_classes = meta['num_classes']
+    kv.clock = meta['clock']
+
+    return kv, meta